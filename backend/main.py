@@ -1,9 +1,12 @@
-from dotenv import load_dotenv
-load_dotenv()
+from services.settings import get_settings
+get_settings()
 
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from routers import lead_contacts, leads, health, test_supabase, emails, messages, whatsapp, qr_admin, showroom
+from fastapi.responses import JSONResponse
+from routers import lead_contacts, leads, health, test_supabase, emails, messages, whatsapp, qr_admin, showroom, canned_responses, translation_admin, settings_admin
 
 import logging
 
@@ -34,6 +37,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    """Reject oversized bodies (e.g. huge base64 attachments) before they are read into memory"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > get_settings().max_request_bytes:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
+
 # Include routers
 app.include_router(health.router)
 app.include_router(lead_contacts.router)
@@ -43,4 +54,77 @@ app.include_router(emails.router)
 app.include_router(messages.router)
 app.include_router(whatsapp.router)
 app.include_router(qr_admin.router)
-app.include_router(showroom.router)
\ No newline at end of file
+app.include_router(showroom.router)
+app.include_router(canned_responses.router)
+app.include_router(translation_admin.router)
+app.include_router(settings_admin.router)
+
+
+@app.on_event("startup")
+async def resume_pending_translations():
+    """Translate inbound messages left pending by a previous or crashed process (deferred translation)"""
+    from services.translation_worker import recover_pending_translations
+
+    app.state.pending_translations_task = asyncio.create_task(recover_pending_translations())
+
+
+@app.on_event("startup")
+async def warm_up_language_detection():
+    """Load language detection profiles before the first webhook arrives"""
+    from services.language_detection import get_language_detection_service
+
+    await asyncio.to_thread(get_language_detection_service().warm_up)
+
+
+@app.on_event("startup")
+async def start_message_outbox_worker():
+    """Deliver queued agent messages (MESSAGE_OUTBOX_ENABLED=true)"""
+    from services.message_outbox import is_outbox_enabled, get_message_outbox_worker
+
+    if is_outbox_enabled():
+        app.state.message_outbox_task = asyncio.create_task(get_message_outbox_worker().run())
+
+
+@app.on_event("startup")
+async def start_email_queue_worker():
+    """Send queued lead notifications and email replies (EMAIL_QUEUE_ENABLED=true)"""
+    from services.email_queue import is_email_queue_enabled, get_email_queue_worker
+
+    if is_email_queue_enabled():
+        app.state.email_queue_task = asyncio.create_task(get_email_queue_worker().run())
+
+
+@app.on_event("shutdown")
+async def stop_message_outbox_worker():
+    """Let the outbox worker finish its current batch"""
+    from services.message_outbox import get_message_outbox_worker
+
+    task = getattr(app.state, "message_outbox_task", None)
+    if task is not None:
+        get_message_outbox_worker().stop()
+        try:
+            await asyncio.wait_for(task, timeout=10)
+        except asyncio.TimeoutError:
+            task.cancel()
+
+
+@app.on_event("shutdown")
+async def stop_email_queue_worker():
+    """Let the email queue worker finish its current batch"""
+    from services.email_queue import get_email_queue_worker
+
+    task = getattr(app.state, "email_queue_task", None)
+    if task is not None:
+        get_email_queue_worker().stop()
+        try:
+            await asyncio.wait_for(task, timeout=10)
+        except asyncio.TimeoutError:
+            task.cancel()
+
+
+@app.on_event("shutdown")
+async def stop_pending_translations():
+    """Stop the translation recovery loop (claimed rows are reclaimed by the next process)"""
+    task = getattr(app.state, "pending_translations_task", None)
+    if task is not None:
+        task.cancel()
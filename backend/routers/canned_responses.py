@@ -0,0 +1,54 @@
+"""
+Canned Responses Router
+CRUD for pre-translated agent reply templates
+"""
+from fastapi import APIRouter, HTTPException
+from typing import List
+from schemas.canned_response import CannedResponse, CannedResponseCreate, CannedResponseUpdate
+from services.canned_response_service import get_canned_response_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/canned-responses", tags=["Canned Responses"])
+
+
+@router.get("", response_model=List[CannedResponse])
+def list_canned_responses():
+    """List all canned responses with their translations"""
+    return get_canned_response_service().list_responses()
+
+
+@router.post("", response_model=CannedResponse, status_code=201)
+def create_canned_response(data: CannedResponseCreate):
+    """Create a Turkish template; it is pre-translated into all customer languages"""
+    return get_canned_response_service().create_response(data.title, data.content)
+
+
+@router.put("/{response_id}", response_model=CannedResponse)
+def update_canned_response(response_id: str, data: CannedResponseUpdate):
+    """Update a template; changing the content refreshes its translations"""
+    return get_canned_response_service().update_response(response_id, data.title, data.content)
+
+
+@router.delete("/{response_id}")
+def delete_canned_response(response_id: str):
+    """Delete a template"""
+    try:
+        get_canned_response_service().delete_response(response_id)
+        return {"success": True}
+    except Exception as e:
+        logger.error(f"Error deleting canned response: {e}")
+        raise HTTPException(status_code=500, detail="Canned response could not be deleted")
+
+
+@router.post("/refresh")
+def refresh_canned_responses():
+    """Translate all templates into customer languages that are still missing"""
+    try:
+        return get_canned_response_service().refresh_translations()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error refreshing canned responses: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Canned responses could not be refreshed")
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from services.email_service import get_email_service
-import os
+from services.attachment_fetcher import get_attachment_fetcher
 
 router = APIRouter()
 
@@ -16,12 +16,9 @@ def check_email_config():
     
     return {
         "configured": is_configured,
-        "smtp_server": os.getenv("SMTP_SERVER"),
-        "smtp_port": os.getenv("SMTP_PORT"),
-        "smtp_username": os.getenv("SMTP_USERNAME"),
-        "from_email": os.getenv("FROM_EMAIL"),
-        "from_name": os.getenv("FROM_NAME"),
-        "has_password": bool(os.getenv("SMTP_PASSWORD"))
+        **email_service.smtp.describe(),
+        "smtp_pool": email_service.smtp_pool_stats(),
+        "attachment_cache": get_attachment_fetcher().stats()
     }
 
 @router.post("/health/test-email")
@@ -46,8 +43,29 @@ def test_email_send():
         "success": True,
         "message": "Email service is configured. Use /api/messages/send to test actual sending.",
         "config": {
-            "smtp_server": os.getenv("SMTP_SERVER"),
-            "smtp_port": os.getenv("SMTP_PORT"),
-            "from_email": os.getenv("FROM_EMAIL")
+            "smtp_server": email_service.smtp_server,
+            "smtp_port": email_service.smtp_port,
+            "from_email": email_service.from_email
         }
     }
+
+@router.get("/health/translation")
+def check_translation_stats():
+    """Translation memory hit/miss and coalescing counters"""
+    from services.translation_service import get_translation_service
+    
+    return get_translation_service().get_stats()
+
+@router.get("/health/language-detection")
+def check_language_detection_stats():
+    """How many detections were decided by script vs the statistical detector"""
+    from services.language_detection import get_language_detection_service
+    
+    return get_language_detection_service().stats()
+
+@router.get("/health/email-queue")
+def check_email_queue_stats():
+    """Email queue depth, dead letters and send latency"""
+    from services.email_queue import get_email_queue_worker
+    
+    return get_email_queue_worker().stats()
@@ -2,13 +2,17 @@
 Messages Router
 Handles message sending endpoints
 """
+import asyncio
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Dict
-from services.supabase_client import supabase
+from services.conversation_context import load_conversation_context
 from services.message_service import get_message_service
 from services.whatsapp_service import get_whatsapp_service
 from services.translation_service import get_translation_service
+from services.canned_response_service import get_canned_response_service
+from services.message_outbox import is_outbox_enabled, enqueue_agent_message
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +24,7 @@ class MessageSendRequest(BaseModel):
     conversation_id: str
     content: Optional[str] = None
     media: Optional[List[Dict]] = None
+    canned_response_id: Optional[str] = None  # Pre-translated template picked by the agent
 
 
 class MessageSendResponse(BaseModel):
@@ -27,6 +32,7 @@ class MessageSendResponse(BaseModel):
     message_id: str
     email_sent: bool = False
     blocked_reason: str | None = None
+    delivery_status: str | None = None  # Set in outbox mode (pending until the worker delivers)
     error: str | None = None
 
 
@@ -36,7 +42,7 @@ async def send_message(request: MessageSendRequest):
     Send a message as an agent
     - Saves message in Turkish to database
     - Detects customer's language from conversation
-    - Translates message to customer's language
+    - Translates message to customer's language (template replies use stored translations)
     - Sends email if conversation channel is email
     """
     try:
@@ -45,70 +51,99 @@ async def send_message(request: MessageSendRequest):
         media = request.media or []
         has_media = len(media) > 0
 
-        if not raw_content and not has_media:
+        if not raw_content and not has_media and not request.canned_response_id:
             raise HTTPException(
                 status_code=400,
                 detail="Message content cannot be empty"
             )
 
-        # Get conversation details
-        conv_response = (
-            supabase
-            .table("conversations")
-            .select("customer_id, channel")
-            .eq("id", conversation_id)
-            .execute()
-        )
-
-        if not conv_response.data or len(conv_response.data) == 0:
+        # Conversation, customer and last customer message in one query
+        context = await asyncio.to_thread(load_conversation_context, conversation_id)
+        if context is None:
             raise HTTPException(
                 status_code=404,
                 detail="Conversation not found"
             )
 
-        conversation = conv_response.data[0]
-        customer_id = conversation.get('customer_id')
-        channel = conversation.get('channel', 'whatsapp')
-
-        # Get customer email and phone
-        customer_email = None
-        customer_phone = None
-        if customer_id:
-            customer_response = (
-                supabase
-                .table("customers")
-                .select("email, phone")
-                .eq("id", customer_id)
-                .execute()
-            )
-            if customer_response.data and len(customer_response.data) > 0:
-                customer_email = customer_response.data[0].get('email')
-                customer_phone = customer_response.data[0].get('phone')
+        channel = context.channel
+        customer_email = context.customer_email
+        customer_phone = context.customer_phone
 
-        # Get customer's language from previous messages
+        # Customer's language: conversation estimate, else the last customer message
         message_service = get_message_service()
-        customer_language = message_service.get_customer_language(conversation_id)
+        customer_language = context.customer_language
+
+        # Template reply: use the template text and its stored translation
+        translated_content = None
+        if request.canned_response_id:
+            template = await asyncio.to_thread(
+                get_canned_response_service().get_translation,
+                request.canned_response_id,
+                customer_language
+            )
+            if not template:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Canned response not found"
+                )
+            raw_content, translated_content = template
 
         # Use placeholder content for media-only messages
         turkish_content = raw_content or "Medya"
 
-        # Create agent message (this will handle translation and email sending)
+        # Outbox mode: store message + delivery job and return; the worker translates and sends
+        if is_outbox_enabled():
+            language_known = bool(customer_language) and customer_language != 'unknown'
+            blocked_reason = None
+            deliver = True
+            if channel == 'email' and customer_email and not language_known:
+                blocked_reason = "Customer language is unknown. Reply not sent."
+                deliver = False
+            elif channel == 'whatsapp' and customer_phone and raw_content and not language_known:
+                blocked_reason = "Customer language is unknown. WhatsApp reply not sent."
+                deliver = has_media  # Media still goes out
+            
+            message = await asyncio.to_thread(
+                enqueue_agent_message,
+                context,
+                turkish_content,
+                raw_content,
+                media,
+                translated_content,
+                customer_language,
+                deliver
+            )
+            return MessageSendResponse(
+                success=True,
+                message_id=message.get('id'),
+                blocked_reason=blocked_reason,
+                delivery_status=message.get('delivery_status')
+            )
+
+        # Translate once for the customer's channel (off the event loop)
+        if translated_content is None and channel in ('email', 'whatsapp') and customer_language and customer_language not in ('unknown', 'tr'):
+            translator = get_translation_service()
+            translated_content = await translator.atranslate(
+                turkish_content,
+                source_language='tr',
+                target_language=customer_language
+            )
+            logger.info(f"Translated message from Turkish to {customer_language}")
+
+        # Create agent message (this will handle email sending)
         try:
-            message = message_service.create_agent_message(
+            message = await message_service.create_agent_message(
                 conversation_id=conversation_id,
                 turkish_content=turkish_content,
                 customer_language=customer_language,
                 customer_email=customer_email,
-                media=media
+                media=media,
+                translated_content=translated_content,
+                context=context
             )
 
-            # Update conversation
-            supabase.table("conversations").update({
-                'last_message': turkish_content[:200],
-                'last_message_at': message.get('sent_at'),
-                'is_read': True,
-                'updated_at': message.get('sent_at')
-            }).eq('id', conversation_id).execute()
+            # conversations.last_message/last_message_at/is_read are updated by the
+            # trigger_update_conversation_on_message insert trigger
 
             # Get email_sent status from message_service response
             email_sent = message.get('email_sent', False)
@@ -131,18 +166,11 @@ async def send_message(request: MessageSendRequest):
                             blocked_reason = "Customer language is unknown. WhatsApp reply not sent."
                             logger.warning(f"WhatsApp reply blocked for {customer_phone}: {blocked_reason}")
                             translated_message = None
-                        else:
-                            if customer_language != 'tr':
-                                translator = get_translation_service()
-                                translated_message = translator.translate_from_turkish(
-                                    raw_content,
-                                    target_language=customer_language
-                                )
-                                if not translated_message:
-                                    logger.warning("Translation failed, sending Turkish content as-is")
-                                    translated_message = raw_content
-                                else:
-                                    logger.info(f"Translated message from Turkish to {customer_language}")
+                        elif customer_language != 'tr':
+                            translated_message = translated_content
+                            if not translated_message:
+                                logger.warning("Translation failed, sending Turkish content as-is")
+                                translated_message = raw_content
                     elif has_media:
                         translated_message = None
 
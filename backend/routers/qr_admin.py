@@ -4,15 +4,16 @@ Secure endpoint for admins to get WhatsApp QR code
 """
 from fastapi import APIRouter, HTTPException, Header
 from services.whatsapp_service import get_whatsapp_service
-import os
+from services.settings import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
-# Admin token from environment (change this in production!)
-ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "change_this_secure_token")
+def _admin_token() -> str:
+    # Admin token from settings (change this in production!)
+    return get_settings().admin_token
 
 
 @router.get("/whatsapp/qr")
@@ -37,7 +38,7 @@ async def get_whatsapp_qr(authorization: str = Header(None)):
     
     token = authorization.replace("Bearer ", "")
     
-    if token != ADMIN_TOKEN:
+    if token != _admin_token():
         logger.warning(f"Unauthorized QR access attempt")
         raise HTTPException(
             status_code=401,
@@ -92,7 +93,7 @@ async def get_whatsapp_status(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     token = authorization.replace("Bearer ", "")
-    if token != ADMIN_TOKEN:
+    if token != _admin_token():
         raise HTTPException(status_code=401, detail="Invalid admin token")
     
     try:
@@ -0,0 +1,52 @@
+"""
+Settings Admin Endpoints
+Reload backend/.env without restarting the backend (Admin only)
+"""
+from fastapi import APIRouter, Header
+from routers.translation_admin import verify_admin
+from services.settings import reload_settings, get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin/settings", tags=["Admin"])
+
+# Read once at startup by long-lived clients; changing them needs a restart
+RESTART_REQUIRED = {"supabase_url", "supabase_service_role_key"}
+
+
+@router.post("/reload")
+def reload(authorization: str = Header(None)):
+    """
+    Re-read settings (SMTP, WhatsApp URL, media bucket, admin token, feature flags)
+    
+    Requires: Authorization header with Bearer token
+    """
+    verify_admin(authorization)
+    changed = reload_settings()
+    return {
+        "success": True,
+        "changed": changed,
+        "restart_required": sorted(RESTART_REQUIRED.intersection(changed)),
+    }
+
+
+@router.get("")
+def show(authorization: str = Header(None)):
+    """
+    Current non-secret settings
+    """
+    verify_admin(authorization)
+    settings = get_settings()
+    return {
+        "supabase_url": settings.supabase_url,
+        "media_bucket": settings.media_bucket,
+        "media_bucket_public": settings.media_bucket_public,
+        "media_dedup_enabled": settings.media_dedup_enabled,
+        "whatsapp_service_url": settings.whatsapp_service_url,
+        "smtp": settings.smtp.describe(),
+        "message_outbox_enabled": settings.message_outbox_enabled,
+        "email_queue_enabled": settings.email_queue_enabled,
+        "deferred_translation": settings.deferred_translation,
+        "max_request_bytes": settings.max_request_bytes,
+    }
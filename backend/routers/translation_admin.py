@@ -0,0 +1,77 @@
+"""
+Translation Admin Endpoints
+Start, monitor and stop the historical translation backfill (Admin only)
+"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Header
+from pydantic import BaseModel
+from services.translation_backfill import get_translation_backfill, DEFAULT_RATE
+from services.settings import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin/translation", tags=["Admin"])
+
+
+
+class BackfillStartRequest(BaseModel):
+    """Backfill run options"""
+    rate: float = DEFAULT_RATE
+    limit: Optional[int] = None
+    reset: bool = False
+    dry_run: bool = False
+
+
+def verify_admin(authorization: Optional[str]):
+    """Raise 401 unless the Bearer token matches the admin token (same as the WhatsApp QR endpoints)"""
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    token = authorization.replace("Bearer ", "")
+    if token != get_settings().admin_token:
+        logger.warning("Unauthorized admin access attempt")
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/backfill")
+def start_backfill(request: BackfillStartRequest, authorization: str = Header(None)):
+    """
+    Start re-detecting and re-translating historical messages in the background
+    Resumes from the last checkpoint unless reset is true
+    """
+    verify_admin(authorization)
+    
+    job = get_translation_backfill()
+    if job.progress().get('state') == "running":
+        raise HTTPException(status_code=409, detail="Backfill is already running")
+    
+    job.rate = request.rate
+    job.dry_run = request.dry_run
+    if request.reset:
+        job.reset_checkpoint()
+    job.start(limit=request.limit)
+    
+    return {"success": True, "progress": job.progress()}
+
+
+@router.get("/backfill")
+def get_backfill_progress(authorization: str = Header(None)):
+    """
+    Progress of the current or last backfill run
+    """
+    verify_admin(authorization)
+    
+    job = get_translation_backfill()
+    return {"progress": job.progress(), "checkpoint": job.load_checkpoint()}
+
+
+@router.delete("/backfill")
+def stop_backfill(authorization: str = Header(None)):
+    """
+    Stop the running backfill after its current batch (progress is checkpointed)
+    """
+    verify_admin(authorization)
+    
+    get_translation_backfill().stop()
+    return {"success": True}
@@ -2,14 +2,17 @@
 WhatsApp Router
 Handles incoming WhatsApp webhooks and WhatsApp-related endpoints
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from schemas.whatsapp import WhatsAppIncomingRequest, WhatsAppIncomingResponse
 from services.language_detection import get_language_detection_service
+from services.conversation_context import fold_conversation_language
 from services.translation_service import get_translation_service
+from services.translation_worker import is_deferred_translation_enabled, translate_pending_message
 from services.message_service import get_message_service
 from services.whatsapp_service import get_whatsapp_service
 from services.media_service import get_media_service
 from services.supabase_client import supabase
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -48,7 +51,7 @@ def is_valid_phone_number(phone: str) -> bool:
 
 
 @router.post("/incoming", response_model=WhatsAppIncomingResponse)
-async def handle_incoming_whatsapp(request: WhatsAppIncomingRequest):
+async def handle_incoming_whatsapp(request: WhatsAppIncomingRequest, background_tasks: BackgroundTasks):
     """
     Handle incoming WhatsApp message webhook
     Processes message, detects language, translates to Turkish,
@@ -103,7 +106,7 @@ async def handle_incoming_whatsapp(request: WhatsAppIncomingRequest):
             )
         
         # Detect language (with safe fallback)
-        detected_language = language_detector.detect_language(message_content)
+        detected_language, detection_confidence = language_detector.detect_language_with_confidence(message_content)
         
         # Safe fallback: if language detection returns null or unknown, keep as unknown
         if not detected_language or detected_language == 'unknown':
@@ -111,11 +114,16 @@ async def handle_incoming_whatsapp(request: WhatsAppIncomingRequest):
             logger.warning("Language detection returned null/unknown, keeping as unknown")
         
         # Translate to Turkish if not already Turkish (and language is known)
+        # In deferred mode the message is stored untranslated and translated in the background
         translated_content = None
-        if detected_language and detected_language not in ('tr', 'unknown'):
-            translated_content = translator.translate_to_turkish(
+        translation_status = None
+        if detected_language and detected_language not in ('tr', 'unknown') and is_deferred_translation_enabled():
+            translation_status = 'pending'
+        elif detected_language and detected_language not in ('tr', 'unknown'):
+            translated_content = await translator.atranslate(
                 message_content,
-                source_language=detected_language
+                source_language=detected_language,
+                target_language='tr'
             )
             # If translation fails, fallback to original content (assume it's Turkish)
             if not translated_content:
@@ -211,7 +219,7 @@ async def handle_incoming_whatsapp(request: WhatsAppIncomingRequest):
         
         # Process attachments
         media_service = get_media_service()
-        media = media_service.process_attachments(attachments, conversation['id'])
+        media = await media_service.aprocess_attachments(attachments, conversation['id'])
 
         # Create message with translation
         message = message_service.create_customer_message(
@@ -220,16 +228,36 @@ async def handle_incoming_whatsapp(request: WhatsAppIncomingRequest):
             original_content=message_content,  # Original message in customer's language
             original_language=detected_language,  # Detected language code
             customer_email=None,  # No email for WhatsApp
-            media=media
+            media=media,
+            translation_status=translation_status
         )
         
-        # Update conversation with Turkish content (display_content)
-        supabase.table("conversations").update({
-            'last_message': display_content[:200],  # Turkish content for frontend
-            'last_message_at': message['sent_at'],
-            'is_read': False,
-            'updated_at': message['sent_at']
-        }).eq('id', conversation['id']).execute()
+        # last_message/last_message_at/is_read are set by the messages insert trigger
+        # (update_conversation_on_message)
+        
+        # Fold this message into the conversation language estimate (best effort:
+        # a failure must not fail ingestion, the sender would retry and store it twice)
+        try:
+            await asyncio.to_thread(
+                fold_conversation_language,
+                conversation['id'],
+                detected_language,
+                detection_confidence,
+                message_content
+            )
+        except Exception as e:
+            logger.warning(f"Could not update language estimate of conversation {conversation['id']}: {e}")
+        
+        # Deferred mode: translate after the response is sent
+        if translation_status == 'pending':
+            background_tasks.add_task(
+                translate_pending_message,
+                message_id=message['id'],
+                conversation_id=conversation['id'],
+                original_content=message_content,
+                source_language=detected_language,
+                sent_at=message['sent_at']
+            )
         
         logger.info(f"Processed WhatsApp message from {phone_number}, language: {detected_language}")
         
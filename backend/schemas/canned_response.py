@@ -0,0 +1,41 @@
+"""
+Canned response schemas
+Pre-translated reply templates for agents
+"""
+from pydantic import BaseModel, field_validator
+from typing import Optional, Dict, Any
+
+
+class CannedResponseCreate(BaseModel):
+    """
+    New canned response (Turkish template)
+    """
+    title: str
+    content: str
+
+    @field_validator("title", "content")
+    @classmethod
+    def not_empty(cls, v: str) -> str:
+        if not v or not v.strip():
+            raise ValueError("Bu alan boş olamaz.")
+        return v.strip()
+
+
+class CannedResponseUpdate(BaseModel):
+    """
+    Canned response update (changing content refreshes translations)
+    """
+    title: Optional[str] = None
+    content: Optional[str] = None
+
+
+class CannedResponse(BaseModel):
+    """
+    Canned response with its translations
+    """
+    id: str
+    title: str
+    content: str
+    translations: Dict[str, str] = {}
+    created_at: Any = None
+    updated_at: Any = None
@@ -0,0 +1,396 @@
+"""
+Attachment Fetcher
+Materializes outgoing email attachments
+- URL attachments are downloaded concurrently over one shared HTTP client
+- downloads stream to disk into a content-addressed cache (file name = SHA-256),
+  bounded by total bytes with LRU eviction, so the same brochure/PDF is fetched once
+- inline base64 attachments are decoded as before
+Media URLs are unique per upload, so a cached URL never changes content
+Materialized attachments are bytes: the MIME part (MIMEBase.set_payload) and
+smtplib's flattened message need the whole content in memory, so memory is
+bounded by the size caps: each attachment reserves its size (cache index size,
+downloaded file size or decoded base64 size) against the per-attachment cap and
+the email's running total before its content is read; attachments that do not
+fit are skipped
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple, Any
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment)
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_TIMEOUT_SECONDS = 20.0
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_ATTACHMENT_BYTES = 25 * 1024 * 1024
+# Most SMTP servers reject larger messages anyway
+DEFAULT_MAX_TOTAL_BYTES = 25 * 1024 * 1024
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "attachment_cache",
+)
+
+_CHUNK_SIZE = 64 * 1024
+_INDEX_FILE = "index.json"
+
+# (filename, content_type, data)
+Attachment = Tuple[str, str, bytes]
+
+
+class AttachmentTooLarge(Exception):
+    """Attachment exceeds the size limit"""
+
+
+class _ByteBudget:
+    """
+    Bytes one email may hold in memory, shared by its concurrent materializations
+    """
+
+    def __init__(self, max_attachment_bytes: int, max_total_bytes: int):
+        self.max_attachment_bytes = max_attachment_bytes
+        self.max_total_bytes = max_total_bytes
+        self.reserved = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int, name: str):
+        """
+        Reserve `size` bytes before reading them
+
+        Raises:
+            AttachmentTooLarge: Attachment or email total would exceed its cap
+        """
+        if size > self.max_attachment_bytes:
+            raise AttachmentTooLarge(f"{name} exceeds {self.max_attachment_bytes} bytes")
+        with self._lock:
+            if self.reserved + size > self.max_total_bytes:
+                raise AttachmentTooLarge(f"{name} would take email attachments past {self.max_total_bytes} bytes")
+            self.reserved += size
+
+    def release(self, size: int):
+        with self._lock:
+            self.reserved -= size
+
+
+class AttachmentCache:
+    """
+    Content-addressed file cache bounded by total size (thread-safe)
+    Blobs are stored as <directory>/<sha256>; url -> sha256 is kept in index.json
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Initialize attachment cache (existing blobs are picked up, oldest first in LRU order)
+
+        Args:
+            directory: Cache directory
+            max_bytes: Total blob size kept; least recently used blobs are evicted beyond it
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()
+        self._urls: Dict[str, str] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if len(name) != 64:
+                continue
+            try:
+                stat = os.stat(self._blob_path(name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._blobs[name] = size
+            self.total_bytes += size
+
+        try:
+            with open(os.path.join(self.directory, _INDEX_FILE), "r", encoding="utf-8") as f:
+                urls = json.load(f)
+            self._urls = {url: digest for url, digest in urls.items() if digest in self._blobs}
+        except (OSError, ValueError):
+            self._urls = {}
+
+    def _save_index(self):
+        # Caller holds the lock
+        path = os.path.join(self.directory, _INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._urls, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write attachment cache index: {e}")
+
+    def get(self, url: str, budget: Optional[_ByteBudget] = None) -> Optional[bytes]:
+        """
+        Cached content of a URL, or None
+
+        Args:
+            url: Source URL
+            budget: The blob size is reserved against it before the blob is read
+
+        Raises:
+            AttachmentTooLarge: Cached content does not fit the budget (nothing is read)
+        """
+        with self._lock:
+            digest = self._urls.get(url)
+            if digest is None or digest not in self._blobs:
+                self.misses += 1
+                return None
+            size = self._blobs[digest]
+            self._blobs.move_to_end(digest)
+        if budget is not None:
+            budget.reserve(size, url)
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                data = f.read()
+            os.utime(self._blob_path(digest))
+        except OSError:
+            # Evicted between lookup and read
+            if budget is not None:
+                budget.release(size)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def temp_file(self):
+        """
+        Open a temporary file in the cache directory (same filesystem, so add() can rename it)
+        """
+        return tempfile.NamedTemporaryFile(dir=self.directory, prefix="download-", delete=False)
+
+    def add(self, url: str, temp_path: str, digest: str, size: int):
+        """
+        Move a downloaded file into the cache under its content hash
+
+        Args:
+            url: Source URL
+            temp_path: File created by temp_file()
+            digest: SHA-256 hex digest of the content
+            size: Content size in bytes
+        """
+        with self._lock:
+            if digest in self._blobs:
+                os.remove(temp_path)
+                self._blobs.move_to_end(digest)
+            else:
+                os.replace(temp_path, self._blob_path(digest))
+                self._blobs[digest] = size
+                self.total_bytes += size
+                self._evict(keep=digest)
+            self._urls[url] = digest
+            self._save_index()
+
+    def _evict(self, keep: str):
+        # Caller holds the lock
+        while self.total_bytes > self.max_bytes and len(self._blobs) > 1:
+            digest, size = next(iter(self._blobs.items()))
+            if digest == keep:
+                self._blobs.move_to_end(digest)
+                continue
+            del self._blobs[digest]
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+        live = set(self._blobs)
+        self._urls = {url: digest for url, digest in self._urls.items() if digest in live}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._blobs),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class AttachmentFetcher:
+    """
+    Concurrent attachment materialization for outgoing emails
+    """
+
+    def __init__(self, cache: Optional[AttachmentCache] = None,
+                 workers: int = DEFAULT_FETCH_WORKERS,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 max_attachment_bytes: int = DEFAULT_MAX_ATTACHMENT_BYTES,
+                 max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES):
+        """
+        Initialize attachment fetcher
+
+        Args:
+            cache: Download cache (None = no caching)
+            workers: Downloads in flight at once
+            timeout: HTTP timeout per download in seconds
+            max_attachment_bytes: Larger attachments are skipped (download is aborted)
+            max_total_bytes: Attachments of one email past this total are skipped
+        """
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_attachment_bytes = max_attachment_bytes
+        self.max_total_bytes = max_total_bytes
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="attachment-fetch")
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        timeout=self.timeout,
+                        follow_redirects=True,
+                        limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+                    )
+        return self._client
+
+    def _download(self, url: str, budget: _ByteBudget) -> bytes:
+        """
+        Stream a URL to a file while hashing it, then add it to the cache
+        The content is read back only after its size is reserved in the budget
+        (a download that does not fit is still cached)
+
+        Raises:
+            AttachmentTooLarge: Content exceeds max_attachment_bytes or the email budget
+            httpx.HTTPError: Download failed
+        """
+        cache = self.cache
+        hasher = hashlib.sha256()
+        size = 0
+        temp = cache.temp_file() if cache else tempfile.NamedTemporaryFile(prefix="download-", delete=False)
+        try:
+            with temp:
+                with self._get_client().stream("GET", url) as resp:
+                    resp.raise_for_status()
+                    for chunk in resp.iter_bytes(_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_attachment_bytes:
+                            raise AttachmentTooLarge(f"{url} exceeds {self.max_attachment_bytes} bytes")
+                        hasher.update(chunk)
+                        temp.write(chunk)
+            try:
+                budget.reserve(size, url)
+            except AttachmentTooLarge:
+                if cache:
+                    cache.add(url, temp.name, hasher.hexdigest(), size)
+                raise
+            with open(temp.name, "rb") as f:
+                data = f.read()
+            if cache:
+                cache.add(url, temp.name, hasher.hexdigest(), size)
+            return data
+        finally:
+            if os.path.exists(temp.name):
+                os.remove(temp.name)
+
+    def _materialize(self, attachment: Dict[str, Any], budget: _ByteBudget) -> Optional[Attachment]:
+        filename = attachment.get("name") or "attachment"
+        content_type = attachment.get("type") or "application/octet-stream"
+        try:
+            data = None
+            if attachment.get("data"):
+                encoded = attachment.get("data")
+                # Decoded size is at most 3/4 of the base64 length
+                estimate = len(encoded) * 3 // 4
+                budget.reserve(estimate, filename)
+                try:
+                    data = base64.b64decode(encoded)
+                except Exception:
+                    budget.release(estimate)
+                    raise
+                budget.release(estimate - len(data))
+            elif attachment.get("url"):
+                url = attachment.get("url")
+                data = self.cache.get(url, budget) if self.cache else None
+                if data is None:
+                    data = self._download(url, budget)
+            if not data:
+                logger.warning(f"Skipping attachment without data: {filename}")
+                return None
+            return filename, content_type, data
+        except Exception as e:
+            logger.warning(f"Failed to attach file {filename}: {e}")
+            return None
+
+    def fetch_all(self, attachments: List[Dict[str, Any]]) -> List[Attachment]:
+        """
+        Materialize attachments concurrently
+
+        Args:
+            attachments: Attachment dicts (name, type, and url or base64 data)
+
+        Returns:
+            (filename, content_type, data) in input order; failed attachments and
+            attachments that do not fit max_total_bytes are left out
+        """
+        if not attachments:
+            return []
+        budget = _ByteBudget(self.max_attachment_bytes, self.max_total_bytes)
+        if len(attachments) == 1:
+            results = [self._materialize(attachments[0], budget)]
+        else:
+            results = list(self._executor.map(lambda attachment: self._materialize(attachment, budget), attachments))
+        return [result for result in results if result is not None]
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats() if self.cache else {}
+
+
+# Singleton instance
+_attachment_fetcher = None
+_attachment_fetcher_lock = threading.Lock()
+
+
+def get_attachment_fetcher() -> AttachmentFetcher:
+    """Get singleton instance of AttachmentFetcher"""
+    global _attachment_fetcher
+    if _attachment_fetcher is None:
+        with _attachment_fetcher_lock:
+            if _attachment_fetcher is None:
+                cache_max_bytes = int(os.getenv("EMAIL_ATTACHMENT_CACHE_MAX_BYTES", str(DEFAULT_CACHE_MAX_BYTES)))
+                cache = None
+                if cache_max_bytes > 0:
+                    try:
+                        cache = AttachmentCache(
+                            directory=os.getenv("EMAIL_ATTACHMENT_CACHE_DIR", DEFAULT_CACHE_DIR),
+                            max_bytes=cache_max_bytes,
+                        )
+                    except OSError as e:
+                        logger.warning(f"Attachment cache disabled: {e}")
+                _attachment_fetcher = AttachmentFetcher(
+                    cache=cache,
+                    workers=int(os.getenv("EMAIL_ATTACHMENT_FETCH_WORKERS", str(DEFAULT_FETCH_WORKERS))),
+                    max_attachment_bytes=int(os.getenv("EMAIL_ATTACHMENT_MAX_BYTES", str(DEFAULT_MAX_ATTACHMENT_BYTES))),
+                    max_total_bytes=int(os.getenv("EMAIL_ATTACHMENT_MAX_TOTAL_BYTES", str(DEFAULT_MAX_TOTAL_BYTES))),
+                )
+    return _attachment_fetcher
@@ -0,0 +1,232 @@
+"""
+Canned Response Service
+Turkish reply templates pre-translated into every customer language
+Sending a template reply needs no translation call
+"""
+from typing import Optional, Dict, List, Tuple
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from services.supabase_client import supabase
+from services.translation_service import get_translation_service
+from services.translation_scheduler import BULK, INTERACTIVE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CannedResponseService:
+    """
+    Service for managing canned responses and their translations
+    """
+
+    def __init__(self):
+        self.translator = get_translation_service()
+
+    def get_customer_languages(self) -> List[str]:
+        """
+        Get customer languages seen in messages.original_language
+
+        Returns:
+            List of language codes (without 'tr' and 'unknown')
+        """
+        try:
+            response = supabase.table("message_languages").select("language").execute()
+            return sorted({row['language'] for row in (response.data or []) if row.get('language')})
+        except Exception as e:
+            logger.error(f"Error loading customer languages: {e}")
+            return []
+
+    def _translate(self, contents: List[str], languages: List[str],
+                   priority: int = INTERACTIVE) -> List[Dict[str, str]]:
+        """
+        Translate Turkish templates into each language (one batch per language)
+        Failed translations are left out so they are retried on next refresh
+        """
+        translations: List[Dict[str, str]] = [{} for _ in contents]
+        for language in languages:
+            translated = self.translator.translate_many(
+                contents,
+                source_language='tr',
+                target_language=language,
+                priority=priority
+            )
+            for index, (content, text) in enumerate(zip(contents, translated)):
+                if text and text != content:
+                    translations[index][language] = text
+        return translations
+
+    def list_responses(self) -> List[Dict]:
+        """
+        List all canned responses
+        """
+        try:
+            response = (
+                supabase
+                .table("canned_responses")
+                .select("*")
+                .order("title")
+                .execute()
+            )
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error listing canned responses: {e}")
+            raise HTTPException(status_code=500, detail="Canned responses could not be fetched")
+
+    def get_response(self, response_id: str) -> Optional[Dict]:
+        """
+        Get a canned response by ID
+
+        Returns:
+            Canned response dict or None if not found
+        """
+        response = (
+            supabase
+            .table("canned_responses")
+            .select("*")
+            .eq("id", response_id)
+            .execute()
+        )
+        return response.data[0] if response.data else None
+
+    def create_response(self, title: str, content: str) -> Dict:
+        """
+        Create a canned response, pre-translated into all customer languages
+        """
+        translations = self._translate([content], self.get_customer_languages())[0]
+        response = (
+            supabase
+            .table("canned_responses")
+            .insert({
+                'title': title,
+                'content': content,
+                'translations': translations
+            })
+            .execute()
+        )
+        if not response.data:
+            raise HTTPException(status_code=500, detail="Canned response could not be created")
+        logger.info(f"Created canned response '{title}' with {len(translations)} translations")
+        return response.data[0]
+
+    def update_response(self, response_id: str, title: Optional[str] = None,
+                        content: Optional[str] = None) -> Dict:
+        """
+        Update a canned response; a content change re-translates it
+        """
+        existing = self.get_response(response_id)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Canned response not found")
+
+        update_data: Dict = {'updated_at': datetime.now(timezone.utc).isoformat()}
+        if title and title.strip():
+            update_data['title'] = title.strip()
+        if content and content.strip() and content.strip() != existing.get('content'):
+            update_data['content'] = content.strip()
+            update_data['translations'] = self._translate(
+                [update_data['content']],
+                self.get_customer_languages()
+            )[0]
+
+        response = (
+            supabase
+            .table("canned_responses")
+            .update(update_data)
+            .eq("id", response_id)
+            .execute()
+        )
+        if not response.data:
+            raise HTTPException(status_code=500, detail="Canned response could not be updated")
+        return response.data[0]
+
+    def delete_response(self, response_id: str) -> None:
+        """
+        Delete a canned response
+        """
+        supabase.table("canned_responses").delete().eq("id", response_id).execute()
+
+    def refresh_translations(self) -> Dict[str, int]:
+        """
+        Fill in missing translations for all templates (e.g. after a new customer language appears)
+
+        Returns:
+            Dict with template and new translation counts
+        """
+        templates = self.list_responses()
+        languages = self.get_customer_languages()
+        added = 0
+
+        for language in languages:
+            missing = [t for t in templates if language not in (t.get('translations') or {})]
+            if not missing:
+                continue
+            translated = self._translate([t['content'] for t in missing], [language], priority=BULK)
+            for template, translation in zip(missing, translated):
+                if language in translation:
+                    template.setdefault('translations', {})[language] = translation[language]
+                    template['_changed'] = True
+                    added += 1
+
+        for template in templates:
+            if template.pop('_changed', False):
+                (
+                    supabase
+                    .table("canned_responses")
+                    .update({'translations': template['translations']})
+                    .eq("id", template['id'])
+                    .execute()
+                )
+
+        logger.info(f"Refreshed canned responses: {added} new translations for {len(languages)} languages")
+        return {"templates": len(templates), "languages": len(languages), "translations_added": added}
+
+    def get_translation(self, response_id: str, language: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Get a template and its pre-translated text for a customer language
+        A missing language is translated once and stored for next time
+
+        Args:
+            response_id: Canned response ID
+            language: Customer language code
+
+        Returns:
+            (turkish_content, translated_content) or None if the template does not exist;
+            translated_content is None if the language is unknown or Turkish
+        """
+        template = self.get_response(response_id)
+        if not template:
+            return None
+
+        content = template['content']
+        if not language or language in ('tr', 'unknown'):
+            return content, None
+
+        translations = template.get('translations') or {}
+        if language in translations:
+            return content, translations[language]
+
+        translated = self.translator.translate_from_turkish(content, target_language=language)
+        if translated and translated != content:
+            translations[language] = translated
+            try:
+                (
+                    supabase
+                    .table("canned_responses")
+                    .update({'translations': translations})
+                    .eq("id", response_id)
+                    .execute()
+                )
+            except Exception as e:
+                logger.warning(f"Could not store canned response translation: {e}")
+        return content, translated
+
+
+# Singleton instance
+_canned_response_service = None
+
+
+def get_canned_response_service() -> CannedResponseService:
+    """Get singleton instance of CannedResponseService"""
+    global _canned_response_service
+    if _canned_response_service is None:
+        _canned_response_service = CannedResponseService()
+    return _canned_response_service
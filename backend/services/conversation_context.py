@@ -0,0 +1,122 @@
+"""
+Conversation Context
+Everything an agent send needs about a conversation, loaded in one query
+(conversation + customer + latest customer message via PostgREST embedding)
+"""
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+from services.supabase_client import supabase
+from services.language_detection import (
+    conversation_language_weight,
+    CONVERSATION_SCORE_DECAY,
+    CONVERSATION_MIN_SCORE,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+_CONTEXT_SELECT = (
+    "id, customer_id, channel, language,"
+    " customers(name, email, phone),"
+    " messages(id, original_language, sent_at)"
+)
+
+
+@dataclass
+class ConversationContext:
+    """
+    Conversation, customer and last customer message for one agent send
+    """
+    conversation_id: str
+    channel: str = 'whatsapp'
+    customer_id: Optional[str] = None
+    customer_name: str = "Customer"
+    customer_email: Optional[str] = None
+    customer_phone: Optional[str] = None
+    conversation_language: Optional[str] = None
+    last_customer_message_id: Optional[str] = None
+    last_customer_language: Optional[str] = None
+
+    @property
+    def customer_language(self) -> Optional[str]:
+        """
+        Conversation language estimate, else the language of the last customer message
+        """
+        if self.conversation_language and self.conversation_language != 'unknown':
+            return self.conversation_language
+        return self.last_customer_language
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "ConversationContext":
+        customer = row.get('customers') or {}
+        # Many-to-one embeds come back as an object, but tolerate a list
+        if isinstance(customer, list):
+            customer = customer[0] if customer else {}
+        messages = row.get('messages') or []
+        last_message = messages[0] if messages else {}
+
+        return cls(
+            conversation_id=row['id'],
+            channel=row.get('channel') or 'whatsapp',
+            customer_id=row.get('customer_id'),
+            customer_name=customer.get('name') or "Customer",
+            customer_email=customer.get('email'),
+            customer_phone=customer.get('phone'),
+            conversation_language=row.get('language'),
+            last_customer_message_id=last_message.get('id'),
+            last_customer_language=last_message.get('original_language'),
+        )
+
+
+def load_conversation_context(conversation_id: str) -> Optional[ConversationContext]:
+    """
+    Load conversation context in a single round trip
+
+    Args:
+        conversation_id: Conversation ID
+
+    Returns:
+        ConversationContext or None if the conversation does not exist
+    """
+    response = (
+        supabase
+        .table("conversations")
+        .select(_CONTEXT_SELECT)
+        .eq("id", conversation_id)
+        .eq("messages.sender", "customer")
+        .order("sent_at", desc=True, foreign_table="messages")
+        .limit(1, foreign_table="messages")
+        .execute()
+    )
+    if not response.data:
+        return None
+    return ConversationContext.from_row(response.data[0])
+
+
+def fold_conversation_language(conversation_id: str, language: str,
+                               confidence: float, text: str) -> Optional[str]:
+    """
+    Add one inbound message detection to the conversation language estimate
+    The read-modify-write runs in one database call (row locked), so concurrent
+    messages of a conversation do not overwrite each other's scores
+
+    Args:
+        conversation_id: Conversation ID
+        language: Detected language of the message
+        confidence: Detection confidence 0..1
+        text: Message text
+
+    Returns:
+        Conversation language after the update, or None if nothing was folded
+    """
+    weight = conversation_language_weight(language, confidence, text)
+    if weight <= 0:
+        return None
+    response = supabase.rpc("fold_conversation_language", {
+        'p_conversation_id': conversation_id,
+        'p_language': language,
+        'p_weight': weight,
+        'p_decay': CONVERSATION_SCORE_DECAY,
+        'p_min_score': CONVERSATION_MIN_SCORE,
+    }).execute()
+    return response.data
@@ -0,0 +1,477 @@
+"""
+Email Queue
+Persistent outbound email queue (email_outbox table)
+Lead notifications and agent email replies are stored and sent by
+EmailQueueWorker:
+- a claimed batch is sent back to back over one pooled SMTP session
+- global and per-recipient-domain rate limits (rows over the limit are deferred)
+- transient failures retry with exponential backoff, permanent SMTP rejections
+  of the recipient or message (550-554) and rows out of attempts go to the
+  dead-letter state ('dead')
+- when the server itself is unusable (login refused, connection lost) the worker
+  pauses with growing backoff and the batch goes back without using up attempts
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple
+from services.supabase_client import supabase
+from services.translation_scheduler import TokenBucket
+from services.settings import get_settings
+import asyncio
+import logging
+import os
+import smtplib
+import time
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment)
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_POLL_SECONDS = 5.0
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BACKOFF_SECONDS = 30.0
+DEFAULT_MAX_BACKOFF_SECONDS = 3600.0
+DEFAULT_STALE_LOCK_SECONDS = 300
+DEFAULT_RATE_PER_MINUTE = 60.0
+DEFAULT_DOMAIN_RATE_PER_MINUTE = 20.0
+# Per-domain buckets kept; the least recently used one is dropped beyond this
+DEFAULT_MAX_DOMAIN_BUCKETS = 1024
+
+# Replies that reject the recipient or the message; retrying cannot help
+PERMANENT_SMTP_CODES = frozenset({550, 551, 552, 553, 554})
+
+# email_outbox.status values
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+
+def is_email_queue_enabled() -> bool:
+    """
+    Check if outbound email goes through the queue (EMAIL_QUEUE_ENABLED=true)
+    """
+    return get_settings().email_queue_enabled
+
+
+def recipient_domain(email: str) -> str:
+    return email.rsplit("@", 1)[-1].strip().lower()
+
+
+def enqueue_email(to_email: str, subject: str, body: str,
+                  is_html: bool = False, reply_to: Optional[str] = None,
+                  in_reply_to: Optional[str] = None,
+                  attachments: Optional[List[Dict]] = None,
+                  message_id: Optional[str] = None,
+                  html_body: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Store an email for the queue worker (same arguments as EmailService.send_email)
+
+    Args:
+        message_id: CRM message the email delivers; its delivery_status is updated once sent or dead
+
+    Returns:
+        Created email_outbox row
+    """
+    response = supabase.table("email_outbox").insert({
+        'to_email': to_email,
+        'recipient_domain': recipient_domain(to_email),
+        'subject': subject,
+        'body': body,
+        'is_html': is_html,
+        'html_body': html_body,
+        'reply_to': reply_to,
+        'in_reply_to': in_reply_to,
+        'attachments': attachments or None,
+        'message_id': message_id,
+    }).execute()
+    if not response.data:
+        raise Exception(f"Email enqueue failed: {response}")
+    get_email_queue_worker().notify()
+    return response.data[0]
+
+
+def _is_permanent(error: Exception) -> bool:
+    """
+    Retrying cannot help: the recipient or the message was rejected (550-554)
+    A refused login (535) is a server problem and is retried
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code in PERMANENT_SMTP_CODES for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code in PERMANENT_SMTP_CODES
+    return False
+
+
+def _is_server_unavailable(error: Exception) -> bool:
+    """
+    The SMTP server cannot take any mail right now (login refused, connect/network error)
+    """
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError,
+                          smtplib.SMTPHeloError, smtplib.SMTPServerDisconnected)):
+        return True
+    # SMTPException derives from OSError; only plain socket errors count here
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class EmailQueueWorker:
+    """
+    Drains email_outbox in the backend process
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+                 max_backoff_seconds: float = DEFAULT_MAX_BACKOFF_SECONDS,
+                 stale_lock_seconds: int = DEFAULT_STALE_LOCK_SECONDS,
+                 rate_per_minute: float = DEFAULT_RATE_PER_MINUTE,
+                 domain_rate_per_minute: float = DEFAULT_DOMAIN_RATE_PER_MINUTE,
+                 max_domain_buckets: int = DEFAULT_MAX_DOMAIN_BUCKETS):
+        """
+        Initialize email queue worker
+
+        Args:
+            batch_size: Rows claimed per poll
+            poll_seconds: Idle poll interval (enqueues in this process wake the worker at once)
+            max_attempts: Attempts before an email goes to the dead-letter state
+            backoff_seconds: First retry delay (doubles per attempt)
+            max_backoff_seconds: Retry delay cap
+            stale_lock_seconds: Reclaim rows left 'sending' by a crashed worker after this long
+            rate_per_minute: Emails per minute overall (<= 0 = unlimited)
+            domain_rate_per_minute: Emails per minute to one recipient domain (<= 0 = unlimited)
+            max_domain_buckets: Recipient domains whose rate state is kept (LRU)
+        """
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.stale_lock_seconds = stale_lock_seconds
+        self.domain_rate_per_minute = domain_rate_per_minute
+        self.max_domain_buckets = max(1, max_domain_buckets)
+
+        # Buckets are only touched from the worker loop
+        self._global_bucket = TokenBucket(rate_per_minute / 60.0, max(1.0, rate_per_minute / 6.0))
+        self._domain_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        # Set while the SMTP server is unavailable (monotonic deadline)
+        self._paused_until = 0.0
+        self._outages = 0
+
+        self.sent = 0
+        self.retried = 0
+        self.deferred = 0
+        self.dead = 0
+        self.pauses = 0
+        self._latency_total_ms = 0.0
+        self._latency_max_ms = 0.0
+
+    def notify(self):
+        """
+        Wake the worker (safe to call from any thread)
+        """
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def stop(self):
+        self._stopping = True
+        self.notify()
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Retry delay after `attempts` failed attempts
+        """
+        return min(self.max_backoff_seconds, self.backoff_seconds * (2 ** max(0, attempts - 1)))
+
+    def _pause(self, error: Exception) -> float:
+        """
+        Stop sending while the SMTP server is unavailable; the pause grows per consecutive outage
+
+        Returns:
+            Pause in seconds
+        """
+        self._outages += 1
+        delay = self.backoff(self._outages)
+        self._paused_until = time.monotonic() + delay
+        self.pauses += 1
+        logger.error(f"SMTP server unavailable, pausing email queue for {delay:.0f}s: {error}")
+        return delay
+
+    def _domain_bucket(self, domain: str) -> TokenBucket:
+        bucket = self._domain_buckets.get(domain)
+        if bucket is None:
+            rate = self.domain_rate_per_minute
+            bucket = TokenBucket(rate / 60.0, max(1.0, rate / 6.0))
+            self._domain_buckets[domain] = bucket
+            # The dropped bucket is the longest idle, so almost always full again
+            if len(self._domain_buckets) > self.max_domain_buckets:
+                self._domain_buckets.popitem(last=False)
+        else:
+            self._domain_buckets.move_to_end(domain)
+        return bucket
+
+    def _admit(self, row: Dict[str, Any]) -> float:
+        """
+        Take a send token for the row
+
+        Returns:
+            0 if the row may be sent now, else seconds until it may
+        """
+        domain_bucket = self._domain_bucket(row.get('recipient_domain') or recipient_domain(row['to_email']))
+        wait = max(self._global_bucket.wait_time(1), domain_bucket.wait_time(1))
+        if wait > 0:
+            return wait
+        self._global_bucket.consume(1)
+        domain_bucket.consume(1)
+        return 0.0
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        response = supabase.rpc("claim_email_outbox", {
+            'p_limit': self.batch_size,
+            'p_stale_seconds': self.stale_lock_seconds,
+        }).execute()
+        return response.data or []
+
+    def _update(self, row: Dict[str, Any], update: Dict[str, Any]):
+        now = datetime.now(timezone.utc)
+        update = {'locked_at': None, 'updated_at': now.isoformat(), **update}
+        supabase.table("email_outbox").update(update).eq('id', row['id']).execute()
+
+    def _set_message_status(self, row: Dict[str, Any], delivery_status: str):
+        if row.get('message_id'):
+            (
+                supabase
+                .table("messages")
+                .update({'delivery_status': delivery_status})
+                .eq('id', row['message_id'])
+                .execute()
+            )
+
+    def _defer(self, row: Dict[str, Any], delay: float, error: Optional[Exception] = None):
+        """
+        Put a row back without counting the attempt (rate limited or server unavailable)
+        """
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        update = {
+            'status': STATUS_PENDING,
+            'attempts': max(0, (row.get('attempts') or 1) - 1),
+            'next_attempt_at': retry_at.isoformat(),
+        }
+        if error is not None:
+            update['last_error'] = str(error)
+        self._update(row, update)
+
+    def _record(self, row: Dict[str, Any], error: Optional[Exception]):
+        """
+        Store the outcome of one send (sent, retry or dead)
+        """
+        if error is None:
+            self._update(row, {
+                'status': STATUS_SENT,
+                'last_error': None,
+                'sent_at': datetime.now(timezone.utc).isoformat(),
+            })
+            self._set_message_status(row, "sent")
+            return
+
+        attempts = row.get('attempts') or 1
+        if _is_permanent(error) or attempts >= self.max_attempts:
+            self._update(row, {'status': STATUS_DEAD, 'last_error': str(error)})
+            self._set_message_status(row, "failed")
+            self.dead += 1
+            logger.error(f"Email {row['id']} to {row['to_email']} moved to dead letters after {attempts} attempts: {error}")
+            return
+
+        delay = self.backoff(attempts)
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        self._update(row, {
+            'status': STATUS_PENDING,
+            'last_error': str(error),
+            'next_attempt_at': retry_at.isoformat(),
+        })
+        self.retried += 1
+        logger.warning(f"Email {row['id']} attempt {attempts} failed, retrying in {delay:.0f}s: {error}")
+
+    def _send_batch(self, rows: List[Dict[str, Any]]) -> Tuple[List[Tuple[Dict[str, Any], Optional[Exception]]],
+                                                               Optional[Exception]]:
+        """
+        Send rows back to back on one thread; the SMTP pool hands the same session to each send
+
+        Returns:
+            (row, error) per attempted row, and the error that stopped the batch
+            if the server became unavailable (later rows were not attempted)
+        """
+        from services.email_service import get_email_service
+        email_service = get_email_service()
+
+        results = []
+        for row in rows:
+            started = time.monotonic()
+            try:
+                msg = email_service.build_message(
+                    to_email=row['to_email'],
+                    subject=row['subject'],
+                    body=row['body'],
+                    is_html=bool(row.get('is_html')),
+                    reply_to=row.get('reply_to'),
+                    in_reply_to=row.get('in_reply_to'),
+                    attachments=row.get('attachments'),
+                    html_body=row.get('html_body')
+                )
+                email_service.deliver_message(msg)
+            except Exception as e:
+                if _is_server_unavailable(e):
+                    return results, e
+                results.append((row, e))
+                continue
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self._latency_total_ms += elapsed_ms
+            self._latency_max_ms = max(self._latency_max_ms, elapsed_ms)
+            self.sent += 1
+            self._outages = 0
+            results.append((row, None))
+        return results, None
+
+    def _process(self, send: List[Dict[str, Any]], deferred: List[Tuple[Dict[str, Any], float]]):
+        for row, delay in deferred:
+            try:
+                self._defer(row, delay)
+            except Exception as e:
+                logger.error(f"Could not defer email {row['id']}: {e}")
+
+        results, outage = self._send_batch(send)
+        for row, error in results:
+            try:
+                self._record(row, error)
+            except Exception as store_error:
+                # Row stays 'sending' and is reclaimed after the stale lock timeout
+                logger.error(f"Could not record email result for {row['id']}: {store_error}")
+
+        if outage is not None:
+            delay = self._pause(outage)
+            for row in send[len(results):]:
+                try:
+                    self._defer(row, delay, outage)
+                except Exception as e:
+                    logger.error(f"Could not defer email {row['id']}: {e}")
+
+    async def drain_once(self) -> int:
+        """
+        Claim and send one batch
+
+        Returns:
+            Number of rows claimed
+        """
+        rows = await asyncio.to_thread(self._claim)
+        if not rows:
+            return 0
+
+        send: List[Dict[str, Any]] = []
+        deferred: List[Tuple[Dict[str, Any], float]] = []
+        for row in rows:
+            wait = self._admit(row)
+            if wait > 0:
+                deferred.append((row, wait))
+            else:
+                send.append(row)
+        self.deferred += len(deferred)
+
+        await asyncio.to_thread(self._process, send, deferred)
+        return len(rows)
+
+    async def run(self):
+        """
+        Worker loop; drains until the queue is empty, then waits for a poll or a notify()
+        """
+        from services.email_service import get_email_service
+
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        logger.info("Email queue worker started")
+
+        while not self._stopping:
+            processed = 0
+            paused = self._paused_until - time.monotonic()
+            if paused > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=paused)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if get_email_service().is_configured():
+                try:
+                    processed = await self.drain_once()
+                except Exception as e:
+                    logger.error(f"Email queue poll failed: {e}")
+            if processed >= self.batch_size:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+        logger.info("Email queue worker stopped")
+
+    def queue_depth(self) -> Dict[str, Optional[int]]:
+        """
+        Rows waiting to be sent and rows in the dead-letter state
+        """
+        depth: Dict[str, Optional[int]] = {}
+        for key, statuses in (("pending", ["pending", "sending"]), ("dead", ["dead"])):
+            try:
+                response = (
+                    supabase
+                    .table("email_outbox")
+                    .select("id", count="exact")
+                    .in_("status", statuses)
+                    .limit(1)
+                    .execute()
+                )
+                depth[key] = response.count
+            except Exception as e:
+                logger.warning(f"Could not count email_outbox rows: {e}")
+                depth[key] = None
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth, send counters and send latency since start
+        """
+        return {
+            "queue": self.queue_depth(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "deferred": self.deferred,
+            "dead": self.dead,
+            "pauses": self.pauses,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "avg_send_ms": round(self._latency_total_ms / self.sent, 1) if self.sent else None,
+            "max_send_ms": round(self._latency_max_ms, 1),
+        }
+
+
+# Singleton instance
+_email_queue_worker = None
+
+
+def get_email_queue_worker() -> EmailQueueWorker:
+    """Get singleton instance of EmailQueueWorker"""
+    global _email_queue_worker
+    if _email_queue_worker is None:
+        _email_queue_worker = EmailQueueWorker(
+            batch_size=int(os.getenv("EMAIL_QUEUE_BATCH_SIZE", str(DEFAULT_BATCH_SIZE))),
+            poll_seconds=float(os.getenv("EMAIL_QUEUE_POLL_SECONDS", str(DEFAULT_POLL_SECONDS))),
+            max_attempts=int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS))),
+            backoff_seconds=float(os.getenv("EMAIL_QUEUE_BACKOFF_SECONDS", str(DEFAULT_BACKOFF_SECONDS))),
+            rate_per_minute=float(os.getenv("EMAIL_RATE_PER_MINUTE", str(DEFAULT_RATE_PER_MINUTE))),
+            domain_rate_per_minute=float(os.getenv("EMAIL_DOMAIN_RATE_PER_MINUTE", str(DEFAULT_DOMAIN_RATE_PER_MINUTE))),
+        )
+    return _email_queue_worker
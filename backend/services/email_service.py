@@ -3,23 +3,32 @@ Email Service
 Handles sending and receiving emails
 Supports SMTP for sending and webhook for receiving
 """
-import ssl
 import smtplib
-import base64
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import os
 import logging
-import httpx
-from dotenv import load_dotenv
+from services.settings import SMTPSettings, get_settings
+from services.attachment_fetcher import get_attachment_fetcher
+from services.email_templates import get_reply_template, render_reply
+from services.smtp_pool import (
+    SMTPConnectionPool,
+    DEFAULT_MAX_MESSAGES as DEFAULT_SMTP_MAX_MESSAGES,
+    DEFAULT_MAX_IDLE_SECONDS as DEFAULT_SMTP_MAX_IDLE_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# SMTP sends run on a dedicated bounded pool so they never block the event loop
+DEFAULT_SEND_WORKERS = 4
+DEFAULT_SEND_QUEUE_SIZE = 100
 
 class EmailService:
     """
@@ -28,15 +37,18 @@ class EmailService:
     """
     
     def __init__(self):
-        # Ensure .env is loaded
-        load_dotenv()
-        
-        self.smtp_server = os.getenv("SMTP_SERVER")
-        self.smtp_port = int(os.getenv("SMTP_PORT", "465"))
-        self.smtp_username = os.getenv("SMTP_USERNAME")
-        self.smtp_password = os.getenv("SMTP_PASSWORD")
-        self.from_email = os.getenv("FROM_EMAIL", self.smtp_username)
-        self.from_name = os.getenv("FROM_NAME", "CRM System")
+        # Dedicated SMTP pool; queued + running sends are capped so a dead server cannot pile up work
+        self._send_workers = int(os.getenv("EMAIL_SEND_WORKERS", str(DEFAULT_SEND_WORKERS)))
+        self._send_executor = ThreadPoolExecutor(
+            max_workers=self._send_workers,
+            thread_name_prefix="smtp-send"
+        )
+        self._send_slots = threading.BoundedSemaphore(
+            int(os.getenv("EMAIL_SEND_QUEUE_SIZE", str(DEFAULT_SEND_QUEUE_SIZE)))
+        )
+        self._smtp_pool: Optional[SMTPConnectionPool] = None
+        self._smtp_pool_settings: Optional[SMTPSettings] = None
+        self._smtp_pool_lock = threading.Lock()
         
         # Log configuration status (without exposing password)
         logger.info(f"EmailService initialized - Server: {self.smtp_server}, Port: {self.smtp_port}, Username: {self.smtp_username}, From: {self.from_email}")
@@ -45,10 +57,105 @@ class EmailService:
         if not self.smtp_server:
             logger.warning("SMTP server not configured - SMTP_SERVER is missing")
     
+    @property
+    def smtp(self) -> SMTPSettings:
+        """
+        Current SMTP settings (follows reload_settings)
+        """
+        return get_settings().smtp
+    
+    @property
+    def smtp_server(self) -> Optional[str]:
+        return self.smtp.server
+    
+    @property
+    def smtp_port(self) -> int:
+        return self.smtp.port
+    
+    @property
+    def smtp_username(self) -> Optional[str]:
+        return self.smtp.username
+    
+    @property
+    def smtp_password(self) -> Optional[str]:
+        return self.smtp.password
+    
+    @property
+    def from_email(self) -> Optional[str]:
+        return self.smtp.from_email
+    
+    @property
+    def from_name(self) -> str:
+        return self.smtp.from_name
+    
+    def build_message(self, to_email: str, subject: str, body: str, 
+                      is_html: bool = False, reply_to: Optional[str] = None,
+                      in_reply_to: Optional[str] = None,
+                      attachments: Optional[List[Dict]] = None,
+                      html_body: Optional[str] = None) -> MIMEMultipart:
+        """
+        Build the MIME message for send_email (attachments are materialized here)
+        """
+        # Body alternatives (plain text first, HTML preferred by clients)
+        alternative = MIMEMultipart('alternative')
+        if is_html:
+            alternative.attach(MIMEText(body, 'html'))
+        else:
+            alternative.attach(MIMEText(body, 'plain'))
+            if html_body:
+                alternative.attach(MIMEText(html_body, 'html'))
+        
+        # Attachments go next to the alternatives in multipart/mixed
+        parts = []
+        if attachments:
+            # URLs are fetched concurrently and cached
+            for filename, content_type, data in get_attachment_fetcher().fetch_all(attachments):
+                maintype, subtype = content_type.split("/", 1) if "/" in content_type else ("application", "octet-stream")
+                part = MIMEBase(maintype, subtype)
+                part.set_payload(data)
+                encoders.encode_base64(part)
+                part.add_header("Content-Disposition", f'attachment; filename="{filename}"')
+                parts.append(part)
+        
+        if parts:
+            msg = MIMEMultipart('mixed')
+            msg.attach(alternative)
+            for part in parts:
+                msg.attach(part)
+        else:
+            msg = alternative
+        
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        # Add Reply-To header if provided
+        if reply_to:
+            msg['Reply-To'] = reply_to
+        else:
+            msg['Reply-To'] = self.from_email
+        
+        # Add In-Reply-To header for email threading
+        if in_reply_to:
+            msg['In-Reply-To'] = in_reply_to
+            msg['References'] = in_reply_to
+        
+        return msg
+    
+    def deliver_message(self, msg: MIMEMultipart):
+        """
+        Send a built message over a pooled SMTP session
+        
+        Raises:
+            smtplib.SMTPException / OSError: Send failed
+        """
+        self._get_smtp_pool().send_message(msg)
+    
     def send_email(self, to_email: str, subject: str, body: str, 
                    is_html: bool = False, reply_to: Optional[str] = None,
                    in_reply_to: Optional[str] = None,
-                   attachments: Optional[List[Dict]] = None) -> bool:
+                   attachments: Optional[List[Dict]] = None,
+                   html_body: Optional[str] = None) -> bool:
         """
         Send an email via SMTP
         
@@ -59,6 +166,7 @@ class EmailService:
             is_html: Whether body is HTML format
             reply_to: Reply-To email address (for threading)
             in_reply_to: In-Reply-To header value (for threading)
+            html_body: HTML alternative of a plain-text body (optional)
             
         Returns:
             True if email sent successfully, False otherwise
@@ -72,89 +180,13 @@ class EmailService:
             return False
         
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add Reply-To header if provided
-            if reply_to:
-                msg['Reply-To'] = reply_to
-            else:
-                msg['Reply-To'] = self.from_email
-            
-            # Add In-Reply-To header for email threading
-            if in_reply_to:
-                msg['In-Reply-To'] = in_reply_to
-                msg['References'] = in_reply_to
+            msg = self.build_message(to_email, subject, body, is_html, reply_to, in_reply_to, attachments, html_body)
             
-            # Add body
-            if is_html:
-                msg.attach(MIMEText(body, 'html'))
-            else:
-                msg.attach(MIMEText(body, 'plain'))
-
-            # Attach files if provided
-            if attachments:
-                for attachment in attachments:
-                    try:
-                        filename = attachment.get("name") or "attachment"
-                        content_type = attachment.get("type") or "application/octet-stream"
-                        data = None
-
-                        if attachment.get("data"):
-                            data = base64.b64decode(attachment.get("data"))
-                        elif attachment.get("url"):
-                            resp = httpx.get(attachment.get("url"), timeout=20.0)
-                            if resp.status_code == 200:
-                                data = resp.content
-
-                        if not data:
-                            logger.warning(f"Skipping attachment without data: {filename}")
-                            continue
-
-                        maintype, subtype = content_type.split("/", 1) if "/" in content_type else ("application", "octet-stream")
-                        part = MIMEBase(maintype, subtype)
-                        part.set_payload(data)
-                        encoders.encode_base64(part)
-                        part.add_header("Content-Disposition", f'attachment; filename="{filename}"')
-                        msg.attach(part)
-                    except Exception as e:
-                        logger.warning(f"Failed to attach file {attachment.get('name')}: {e}")
-            
-            # Send email with appropriate method based on port
-            context = ssl.create_default_context()
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-
-            # Port 587 uses STARTTLS, port 465 uses SSL
+            # Send over a pooled session (STARTTLS on 587, SSL otherwise); login is reused
             logger.info(f"Attempting to send email via {self.smtp_server}:{self.smtp_port} to {to_email}")
-            
-            if self.smtp_port == 587:
-                logger.info("Using STARTTLS (port 587)")
-                with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=10) as server:
-                    logger.info("SMTP connection established, starting TLS...")
-                    server.starttls(context=context)
-                    logger.info("TLS started, attempting login...")
-                    server.login(self.smtp_username, self.smtp_password)
-                    logger.info("Login successful, sending message...")
-                    server.send_message(msg)
-                    logger.info("Message sent successfully")
-            else:
-                # Port 465 or other SSL ports
-                logger.info(f"Using SSL connection (port {self.smtp_port})")
-                with smtplib.SMTP_SSL(
-                    self.smtp_server,
-                    self.smtp_port,
-                    context=context,
-                    timeout=10
-                ) as server:
-                    logger.info("SMTP_SSL connection established, attempting login...")
-                    server.login(self.smtp_username, self.smtp_password)
-                    logger.info("Login successful, sending message...")
-                    server.send_message(msg)
-                    logger.info("Message sent successfully")
+            started = time.monotonic()
+            self.deliver_message(msg)
+            logger.info(f"Message sent in {(time.monotonic() - started) * 1000:.0f} ms")
             
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -178,12 +210,105 @@ class EmailService:
             logger.error(f"Error type: {type(e).__name__}")
             return False
     
+    def _get_smtp_pool(self) -> SMTPConnectionPool:
+        """
+        Persistent SMTP sessions, one per send worker at most
+        The pool is rebuilt when reloaded settings change the SMTP server or login
+        """
+        smtp = self.smtp
+        if self._smtp_pool is None or self._smtp_pool_settings != smtp:
+            with self._smtp_pool_lock:
+                if self._smtp_pool is None or self._smtp_pool_settings != smtp:
+                    if self._smtp_pool is not None:
+                        self._smtp_pool.close()
+                    self._smtp_pool_settings = smtp
+                    self._smtp_pool = SMTPConnectionPool(
+                        host=smtp.server,
+                        port=smtp.port,
+                        username=smtp.username,
+                        password=smtp.password,
+                        size=self._send_workers,
+                        max_messages=int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", str(DEFAULT_SMTP_MAX_MESSAGES))),
+                        max_idle_seconds=float(os.getenv("SMTP_MAX_IDLE_SECONDS", str(DEFAULT_SMTP_MAX_IDLE_SECONDS))),
+                    )
+        return self._smtp_pool
+    
+    def smtp_pool_stats(self) -> Dict[str, int]:
+        """
+        SMTP session reuse counters
+        """
+        return self._smtp_pool.stats() if self._smtp_pool else {}
+    
+    def submit_email(self, to_email: str, subject: str, body: str, 
+                     is_html: bool = False, reply_to: Optional[str] = None,
+                     in_reply_to: Optional[str] = None,
+                     attachments: Optional[List[Dict]] = None,
+                     html_body: Optional[str] = None) -> "Future[bool]":
+        """
+        Queue an email on the SMTP pool
+        
+        Returns:
+            Future resolving to send_email's result; already False if the send queue is full
+        """
+        if not self._send_slots.acquire(blocking=False):
+            logger.error(f"Email send queue is full, dropping email to {to_email}")
+            future: "Future[bool]" = Future()
+            future.set_result(False)
+            return future
+        
+        try:
+            future = self._send_executor.submit(
+                self.send_email,
+                to_email, subject, body, is_html, reply_to, in_reply_to, attachments, html_body
+            )
+        except Exception:
+            self._send_slots.release()
+            raise
+        future.add_done_callback(lambda _: self._send_slots.release())
+        return future
+    
+    async def send_email_async(self, to_email: str, subject: str, body: str, 
+                               is_html: bool = False, reply_to: Optional[str] = None,
+                               in_reply_to: Optional[str] = None,
+                               attachments: Optional[List[Dict]] = None,
+                               html_body: Optional[str] = None) -> bool:
+        """
+        Send an email without blocking the event loop (same arguments as send_email)
+        
+        Returns:
+            True if email sent successfully, False otherwise
+        """
+        future = self.submit_email(to_email, subject, body, is_html, reply_to, in_reply_to, attachments, html_body)
+        return await asyncio.wrap_future(future)
+    
+    def _build_reply(self, customer_name: str, translated_message: str,
+                     original_subject: Optional[str],
+                     language: Optional[str]) -> Tuple[str, str, str]:
+        """
+        Build subject, plain-text body and HTML body of a reply email
+        Salutation, signature and default subject come from the precompiled template of `language`
+        """
+        template = get_reply_template(language)
+        
+        # Create email subject with Re: prefix if original subject exists
+        if original_subject:
+            # Remove existing Re: prefix if present
+            subject = original_subject
+            if not subject.startswith("Re:") and not subject.startswith("RE:"):
+                subject = f"Re: {original_subject}"
+        else:
+            subject = f"Re: {template.default_subject}"
+        
+        rendered = render_reply(language, customer_name, translated_message, self.from_name)
+        return subject, rendered.text, rendered.html
+    
     def send_translated_reply(self, to_email: str, customer_name: str, 
                              turkish_message: str, target_language: str,
                              original_language: Optional[str] = None,
                              original_subject: Optional[str] = None,
                              message_id: Optional[str] = None,
-                             attachments: Optional[List[Dict]] = None) -> bool:
+                             attachments: Optional[List[Dict]] = None,
+                             translated_message: Optional[str] = None) -> bool:
         """
         Send a translated reply email to customer
         
@@ -195,41 +320,26 @@ class EmailService:
             original_language: Original language of customer's message (optional)
             original_subject: Original email subject for threading (optional)
             message_id: Original message ID for threading (optional)
+            translated_message: Message already translated to target_language (optional)
             
         Returns:
             True if email sent successfully, False otherwise
         """
         from services.translation_service import get_translation_service
         
-        # Translate message to customer's language
-        translation_service = get_translation_service()
-        translated_message = translation_service.translate_from_turkish(
-            turkish_message, 
-            target_language
-        )
+        # Translate message to customer's language (unless caller already did)
+        if translated_message is None:
+            translation_service = get_translation_service()
+            translated_message = translation_service.translate_from_turkish(
+                turkish_message, 
+                target_language
+            )
         
         if not translated_message:
             logger.error(f"Failed to translate message to {target_language}")
             translated_message = turkish_message  # Fallback to Turkish
         
-        # Create email subject with Re: prefix if original subject exists
-        if original_subject:
-            # Remove existing Re: prefix if present
-            subject = original_subject
-            if not subject.startswith("Re:") and not subject.startswith("RE:"):
-                subject = f"Re: {original_subject}"
-        else:
-            subject = "Re: Your Message"
-        
-        # Create email body
-        body = f"""
-Dear {customer_name},
-
-{translated_message}
-
-Best regards,
-{self.from_name}
-"""
+        subject, body, html_body = self._build_reply(customer_name, translated_message, original_subject, target_language)
         
         # Use message_id for threading if available
         in_reply_to = None
@@ -243,7 +353,70 @@ Best regards,
             is_html=False,
             reply_to=self.from_email,
             in_reply_to=in_reply_to,
-            attachments=attachments
+            attachments=attachments,
+            html_body=html_body
+        )
+    
+    async def asend_translated_reply(self, to_email: str, customer_name: str, 
+                                     turkish_message: str, target_language: str,
+                                     original_language: Optional[str] = None,
+                                     original_subject: Optional[str] = None,
+                                     message_id: Optional[str] = None,
+                                     attachments: Optional[List[Dict]] = None,
+                                     translated_message: Optional[str] = None,
+                                     crm_message_id: Optional[str] = None) -> bool:
+        """
+        Async send_translated_reply: translation and SMTP run off the event loop
+        With EMAIL_QUEUE_ENABLED the reply is stored in the email queue instead of sent inline
+        
+        Args:
+            crm_message_id: Agent message the reply delivers (queue updates its delivery_status)
+        
+        Returns:
+            True if email sent (or queued) successfully, False otherwise
+        """
+        from services.translation_service import get_translation_service
+        
+        if translated_message is None:
+            translated_message = await get_translation_service().atranslate(
+                turkish_message,
+                source_language='tr',
+                target_language=target_language
+            )
+        
+        if not translated_message:
+            logger.error(f"Failed to translate message to {target_language}")
+            translated_message = turkish_message  # Fallback to Turkish
+        
+        subject, body, html_body = self._build_reply(customer_name, translated_message, original_subject, target_language)
+        
+        from services.email_queue import is_email_queue_enabled, enqueue_email
+        if is_email_queue_enabled():
+            try:
+                await asyncio.to_thread(
+                    enqueue_email,
+                    to_email, subject, body,
+                    is_html=False,
+                    reply_to=self.from_email,
+                    in_reply_to=message_id or None,
+                    attachments=attachments,
+                    message_id=crm_message_id,
+                    html_body=html_body
+                )
+                return True
+            except Exception as e:
+                logger.error(f"Failed to queue email to {to_email}: {e}")
+                return False
+        
+        return await self.send_email_async(
+            to_email=to_email, 
+            subject=subject, 
+            body=body, 
+            is_html=False,
+            reply_to=self.from_email,
+            in_reply_to=message_id or None,
+            attachments=attachments,
+            html_body=html_body
         )
     
     def is_configured(self) -> bool:
@@ -253,20 +426,13 @@ Best regards,
         Returns:
             True if configured, False otherwise
         """
-        # Reload environment variables in case they were updated
-        load_dotenv()
-        
-        # Re-check configuration
-        smtp_username = os.getenv("SMTP_USERNAME")
-        smtp_password = os.getenv("SMTP_PASSWORD")
-        smtp_server = os.getenv("SMTP_SERVER")
-        
-        is_config = bool(smtp_username and smtp_password and smtp_server)
+        # Settings are cached; edits to .env take effect via reload_settings()
+        smtp = self.smtp
         
-        if not is_config:
-            logger.warning(f"Email service not configured - Username: {bool(smtp_username)}, Password: {bool(smtp_password)}, Server: {bool(smtp_server)}")
+        if not smtp.configured:
+            logger.warning(f"Email service not configured - Username: {bool(smtp.username)}, Password: {bool(smtp.password)}, Server: {bool(smtp.server)}")
         
-        return is_config
+        return smtp.configured
 
 # Singleton instance
 _email_service = None
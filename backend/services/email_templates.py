@@ -0,0 +1,158 @@
+"""
+Email Templates
+Reply email templates compiled once per language
+Salutation, closing and default subject are pre-translated and baked into each
+compiled template, so rendering is only a substitution of name, message and sender
+(no translation calls). One layout produces both the plain-text and the HTML part
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Template
+from typing import Dict, NamedTuple, Optional
+import html
+
+DEFAULT_LANGUAGE = "en"
+
+# Languages written right to left (HTML part gets dir="rtl")
+RTL_LANGUAGES = {"ar", "fa", "ur", "he"}
+
+
+@dataclass(frozen=True)
+class ReplyPhrases:
+    """
+    Pre-translated fixed parts of a reply ($name is the customer name)
+    """
+    salutation: str
+    closing: str
+    default_subject: str
+
+
+PHRASES: Dict[str, ReplyPhrases] = {
+    "en": ReplyPhrases("Dear $name,", "Best regards,", "Your Message"),
+    "tr": ReplyPhrases("Sayın $name,", "Saygılarımızla,", "Mesajınız"),
+    "de": ReplyPhrases("Guten Tag $name,", "Mit freundlichen Grüßen", "Ihre Nachricht"),
+    "fr": ReplyPhrases("Bonjour $name,", "Cordialement,", "Votre message"),
+    "es": ReplyPhrases("Hola $name:", "Saludos cordiales,", "Su mensaje"),
+    "it": ReplyPhrases("Gentile $name,", "Cordiali saluti,", "Il suo messaggio"),
+    "pt": ReplyPhrases("Olá $name,", "Com os melhores cumprimentos,", "A sua mensagem"),
+    "nl": ReplyPhrases("Beste $name,", "Met vriendelijke groet,", "Uw bericht"),
+    "pl": ReplyPhrases("Dzień dobry $name,", "Z poważaniem,", "Twoja wiadomość"),
+    "ru": ReplyPhrases("Здравствуйте, $name!", "С уважением,", "Ваше сообщение"),
+    "uk": ReplyPhrases("Вітаємо, $name!", "З повагою,", "Ваше повідомлення"),
+    "az": ReplyPhrases("Hörmətli $name,", "Hörmətlə,", "Mesajınız"),
+    "ar": ReplyPhrases("عزيزي $name،", "مع أطيب التحيات،", "رسالتك"),
+    "fa": ReplyPhrases("$name عزیز،", "با احترام،", "پیام شما"),
+    "ur": ReplyPhrases("محترم $name،", "نیک تمناؤں کے ساتھ،", "آپ کا پیغام"),
+    "zh-cn": ReplyPhrases("尊敬的 $name：", "此致敬礼", "您的消息"),
+    "ja": ReplyPhrases("$name 様", "よろしくお願いいたします。", "お問い合わせ"),
+}
+
+# One layout for both parts; ${salutation}/${closing}/${dir} are filled at compile time
+_TEXT_LAYOUT = """
+${salutation}
+
+$$message
+
+${closing}
+$$from_name
+"""
+
+_HTML_LAYOUT = """<!DOCTYPE html>
+<html lang="${lang}" dir="${dir}">
+<body style="font-family: Arial, Helvetica, sans-serif; font-size: 14px; line-height: 1.5; color: #222222;">
+<p>${salutation}</p>
+$$message
+<p>${closing}<br>$$from_name</p>
+</body>
+</html>
+"""
+
+
+class RenderedReply(NamedTuple):
+    text: str
+    html: str
+
+
+@dataclass(frozen=True)
+class CompiledReplyTemplate:
+    """
+    Reply template of one language, ready for substitution
+    """
+    language: str
+    default_subject: str
+    text: Template
+    html: Template
+
+
+def _compile(language: str, phrases: ReplyPhrases) -> CompiledReplyTemplate:
+    # Substituted values are inserted verbatim, so $name in a phrase stays a placeholder
+    text_salutation = phrases.salutation
+    html_salutation = html.escape(phrases.salutation, quote=False).replace("$name", "$html_name")
+    text = Template(_TEXT_LAYOUT).substitute(salutation=text_salutation, closing=phrases.closing)
+    markup = Template(_HTML_LAYOUT).substitute(
+        lang=language,
+        dir="rtl" if language in RTL_LANGUAGES else "ltr",
+        salutation=html_salutation,
+        closing=html.escape(phrases.closing, quote=False),
+    )
+    return CompiledReplyTemplate(
+        language=language,
+        default_subject=phrases.default_subject,
+        text=Template(text),
+        html=Template(markup),
+    )
+
+
+# Compiled once at import (backend startup)
+_TEMPLATES: Dict[str, CompiledReplyTemplate] = {
+    language: _compile(language, phrases) for language, phrases in PHRASES.items()
+}
+
+
+@lru_cache(maxsize=256)
+def get_reply_template(language: Optional[str]) -> CompiledReplyTemplate:
+    """
+    Compiled template for a language code ('de', 'pt-BR', 'zh-CN' ...); English if unknown
+    """
+    code = (language or DEFAULT_LANGUAGE).strip().lower().replace("_", "-")
+    if code in _TEMPLATES:
+        return _TEMPLATES[code]
+    base = code.split("-", 1)[0]
+    if base == "zh":
+        return _TEMPLATES["zh-cn"]
+    return _TEMPLATES.get(base, _TEMPLATES[DEFAULT_LANGUAGE])
+
+
+@lru_cache(maxsize=128)
+def _html_paragraphs(message: str) -> str:
+    """
+    Escaped message as HTML paragraphs (cached: broadcasts render one message many times)
+    """
+    blocks = [block.strip() for block in message.replace("\r\n", "\n").split("\n\n")]
+    return "\n".join(
+        f"<p>{html.escape(block).replace(chr(10), '<br>')}</p>" for block in blocks if block
+    )
+
+
+def render_reply(language: Optional[str], customer_name: str, message: str, from_name: str) -> RenderedReply:
+    """
+    Render a reply in the customer's language
+
+    Args:
+        language: Target language code
+        customer_name: Customer name for the salutation
+        message: Reply text, already translated
+        from_name: Sender name for the signature
+
+    Returns:
+        RenderedReply with the plain-text and HTML bodies
+    """
+    template = get_reply_template(language)
+    return RenderedReply(
+        text=template.text.substitute(name=customer_name, message=message, from_name=from_name),
+        html=template.html.substitute(
+            html_name=html.escape(customer_name),
+            message=_html_paragraphs(message),
+            from_name=html.escape(from_name),
+        ),
+    )
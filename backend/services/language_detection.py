@@ -1,25 +1,254 @@
+import bisect
+import logging
+import os
 import re
-from langdetect import detect, detect_langs
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
 from deep_translator import GoogleTranslator
 
+logger = logging.getLogger(__name__)
+
+# Fixed seed makes langdetect deterministic (same text -> same result)
+DEFAULT_SEED = 0
+
+# Short sample detected once at warm-up so the first webhook does not pay for it
+_WARM_UP_TEXT = "Merhaba, siparişim hakkında bilgi almak istiyorum"
+
+# Share of letters one script needs before it decides the language on its own
+SCRIPT_DOMINANCE = 0.6
+
+# Unicode blocks by script (start, end inclusive); unlisted letters count as "other"
+_SCRIPT_RANGES = sorted([
+    (0x0041, 0x024F, "latin"),
+    (0x1E00, 0x1EFF, "latin"),
+    (0x0370, 0x03FF, "greek"),
+    (0x1F00, 0x1FFF, "greek"),
+    (0x0400, 0x052F, "cyrillic"),
+    (0x0530, 0x058F, "armenian"),
+    (0x0590, 0x05FF, "hebrew"),
+    (0x0600, 0x06FF, "arabic"),
+    (0x0750, 0x077F, "arabic"),
+    (0xFB50, 0xFDFF, "arabic"),
+    (0xFE70, 0xFEFF, "arabic"),
+    (0x0900, 0x097F, "devanagari"),
+    (0x0E00, 0x0E7F, "thai"),
+    (0x10A0, 0x10FF, "georgian"),
+    (0x1100, 0x11FF, "hangul"),
+    (0x3130, 0x318F, "hangul"),
+    (0xAC00, 0xD7AF, "hangul"),
+    (0x3040, 0x30FF, "kana"),
+    (0x31F0, 0x31FF, "kana"),
+    (0x3400, 0x4DBF, "han"),
+    (0x4E00, 0x9FFF, "han"),
+    (0xF900, 0xFAFF, "han"),
+])
+_SCRIPT_STARTS = [start for start, _, _ in _SCRIPT_RANGES]
+
+# Scripts used by (practically) a single language we serve
+_SINGLE_LANGUAGE_SCRIPTS = {
+    "greek": "el",
+    "armenian": "hy",
+    "hebrew": "he",
+    "devanagari": "hi",
+    "thai": "th",
+    "georgian": "ka",
+    "hangul": "ko",
+}
+
+# Marker letters decide a shared-script language only when they run through the
+# text: at least this many words (or every word of a shorter text) and this share
+# of all words. A Turkish name or city in an English/German message stays with langdetect
+MIN_MARKER_WORDS = 2
+MIN_MARKER_WORD_SHARE = 0.25
+
+# Letters that single out one language within a shared script
+_TURKISH_MARKERS = set("ğĞıİ")
+_AZERBAIJANI_MARKERS = set("əƏ")
+_UKRAINIAN_MARKERS = set("іїєґІЇЄҐ")
+_RUSSIAN_MARKERS = set("ыэёЫЭЁ")
+_URDU_MARKERS = set("ٹڈڑںےۓ")
+_PERSIAN_MARKERS = set("پچژگکی")
+
+# Conversation language model: detections are weighted by confidence and by
+# message length (full weight from this many letters on), older evidence decays
+CONVERSATION_FULL_WEIGHT_LETTERS = 60
+CONVERSATION_SCORE_DECAY = 0.9
+CONVERSATION_MIN_SCORE = 0.3
+
+
+def _configured_languages() -> List[str]:
+    """
+    Languages from LANGUAGE_DETECTION_LANGUAGES (comma separated, empty = all profiles)
+    """
+    value = os.getenv("LANGUAGE_DETECTION_LANGUAGES", "")
+    return [code.strip() for code in value.split(",") if code.strip()]
+
 
 class LanguageDetectionService:
+    def __init__(self, languages: Optional[List[str]] = None, seed: int = DEFAULT_SEED):
+        """
+        Initialize language detector (profiles are loaded on first use or by warm_up)
+
+        Args:
+            languages: Language profiles to load (None/empty loads all bundled profiles)
+            seed: Seed for langdetect's random sampling
+        """
+        self.languages = languages or []
+        self.seed = seed
+        self._factory: Optional[DetectorFactory] = None
+        self._lock = threading.Lock()
+
+        self.script_hits = 0
+        self.statistical_calls = 0
+        self.unknown_results = 0
+
+    def _load_factory(self) -> DetectorFactory:
+        available = sorted(
+            name for name in os.listdir(PROFILES_DIRECTORY)
+            if not name.startswith(".")
+        )
+        selected = [code for code in self.languages if code in available]
+        unknown = sorted(set(self.languages) - set(available))
+        if unknown:
+            logger.warning(f"No language profile for: {', '.join(unknown)}")
+        if len(selected) < 2:
+            if self.languages:
+                logger.warning("Language detection needs at least 2 known languages, loading all profiles")
+            selected = available
+
+        profiles = []
+        for code in selected:
+            with open(os.path.join(PROFILES_DIRECTORY, code), "r", encoding="utf-8") as f:
+                profiles.append(f.read())
+
+        factory = DetectorFactory()
+        factory.set_seed(self.seed)
+        factory.load_json_profile(profiles)
+        logger.info(f"Language detector loaded {len(selected)} profiles")
+        return factory
+
+    def _get_factory(self) -> DetectorFactory:
+        if self._factory is None:
+            with self._lock:
+                if self._factory is None:
+                    self._factory = self._load_factory()
+        return self._factory
+
+    def warm_up(self):
+        """
+        Load profiles and run one detection so later calls are at steady-state cost
+        """
+        self.detect_language(_WARM_UP_TEXT)
+
+    @staticmethod
+    def _script_of(char: str) -> str:
+        index = bisect.bisect_right(_SCRIPT_STARTS, ord(char)) - 1
+        if index >= 0:
+            start, end, script = _SCRIPT_RANGES[index]
+            if start <= ord(char) <= end:
+                return script
+        return "other"
+
+    @staticmethod
+    def _marked(words: List[str], markers: set) -> bool:
+        """
+        Marker letters appear in enough of the words to speak for the whole text
+        """
+        marked = sum(1 for word in words if markers.intersection(word))
+        return (
+            marked >= min(MIN_MARKER_WORDS, len(words))
+            and marked / len(words) >= MIN_MARKER_WORD_SHARE
+        )
+
+    def detect_script_language(self, normalized: str) -> Optional[str]:
+        """
+        Decide the language from Unicode script alone when one script dominates
+
+        Args:
+            normalized: Text reduced to letters and single spaces
+
+        Returns:
+            Language code, or None if the statistical detector has to decide
+        """
+        words = normalized.split()
+        letters = "".join(words)
+        if not letters:
+            return None
+        counts = Counter(self._script_of(char) for char in letters)
+        script, count = counts.most_common(1)[0]
+        if count / len(letters) < SCRIPT_DOMINANCE:
+            return None
+
+        present = set(letters)
+        if script in _SINGLE_LANGUAGE_SCRIPTS:
+            return _SINGLE_LANGUAGE_SCRIPTS[script]
+        if script == "arabic":
+            if present & _URDU_MARKERS:
+                return "ur"
+            if present & _PERSIAN_MARKERS:
+                return "fa"
+            return "ar"
+        if script in ("han", "kana"):
+            # Japanese mixes kanji with kana; Chinese uses Han only
+            return "ja" if counts.get("kana") else "zh-cn"
+        if script == "cyrillic":
+            if present & _UKRAINIAN_MARKERS and self._marked(words, _UKRAINIAN_MARKERS):
+                return "uk"
+            # Unmarked Cyrillic is Russian for our customers; langdetect tends to
+            # answer 'mk'/'bg' or nothing for short Russian messages
+            return "ru"
+        if script == "latin":
+            if present & _AZERBAIJANI_MARKERS and self._marked(words, _AZERBAIJANI_MARKERS):
+                return "az"
+            if present & _TURKISH_MARKERS and self._marked(words, _TURKISH_MARKERS):
+                return "tr"
+        return None
+
     def detect_language(self, text: str) -> str:
+        return self.detect_language_with_confidence(text)[0]
+
+    def detect_language_with_confidence(self, text: str) -> Tuple[str, float]:
+        """
+        Detect language and report how sure the detector is
+
+        Returns:
+            (language code or "unknown", confidence 0..1; 1.0 for script decisions)
+        """
+        result = self._detect_language(text)
+        if result[0] == "unknown":
+            self.unknown_results += 1
+        return result
+
+    def _detect_language(self, text: str) -> Tuple[str, float]:
         if not text or not isinstance(text, str):
-            return "unknown"
+            return "unknown", 0.0
 
-        # Normalize: keep letters and spaces only
-        normalized = re.sub(r"[^A-Za-zÀ-ÖØ-öø-ÿ\s]", " ", text)
+        # Normalize: keep letters (any script) and single spaces only
+        normalized = "".join(char if char.isalpha() else " " for char in text)
         normalized = re.sub(r"\s+", " ", normalized).strip()
+        letters = normalized.replace(" ", "")
+
+        # Cheap path: the script alone settles it (Arabic, Cyrillic markers, Turkish letters, ...)
+        if len(letters) >= 2:
+            language = self.detect_script_language(normalized)
+            if language:
+                self.script_hits += 1
+                return language, 1.0
 
         # Short or empty content is unreliable for detection
         if len(normalized) < 5:
-            return "unknown"
+            return "unknown", 0.0
 
         try:
-            candidates = detect_langs(normalized)
+            self.statistical_calls += 1
+            detector = self._get_factory().create()
+            detector.append(normalized)
+            candidates = detector.get_probabilities()
             if not candidates:
-                return "unknown"
+                return "unknown", 0.0
 
             top = candidates[0]
             top_lang = getattr(top, "lang", None)
@@ -27,12 +256,22 @@ class LanguageDetectionService:
 
             # If confidence is low or ambiguous, return unknown
             second_prob = getattr(candidates[1], "prob", 0.0) if len(candidates) > 1 else 0.0
-            if top_prob < 0.85 or (top_prob - second_prob) < 0.2:
-                return "unknown"
+            if top_prob < 0.85 or (top_prob - second_prob) < 0.2 or not top_lang:
+                return "unknown", 0.0
 
-            return top_lang or "unknown"
+            return top_lang, top_prob
         except Exception:
-            return "unknown"
+            return "unknown", 0.0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        How detections were decided
+        """
+        return {
+            "script_hits": self.script_hits,
+            "statistical_calls": self.statistical_calls,
+            "unknown_results": self.unknown_results,
+        }
 
     def translate_to_turkish(self, text: str, source_lang: str) -> str:
         if source_lang == "tr":
@@ -53,5 +292,35 @@ class LanguageDetectionService:
             return text
 
 
+def conversation_language_weight(language: str, confidence: float, text: str) -> float:
+    """
+    Weight of one message detection in its conversation's language estimate
+
+    Short replies ("ok thanks") carry little weight, so they do not flip a
+    conversation; a customer who really switches language wins after a few messages.
+    The scores are folded in SQL (fold_conversation_language) with
+    CONVERSATION_SCORE_DECAY and CONVERSATION_MIN_SCORE.
+
+    Args:
+        language: Detected language of the new message
+        confidence: Detection confidence 0..1
+        text: Message text (its letter count weights the detection)
+
+    Returns:
+        Weight to add to the language's score (0 if there is nothing to fold)
+    """
+    if not language or language == "unknown" or confidence <= 0:
+        return 0.0
+    letters = sum(1 for char in text or "" if char.isalpha())
+    return confidence * min(1.0, letters / CONVERSATION_FULL_WEIGHT_LETTERS)
+
+
+# Singleton instance
+_language_detection_service = None
+
+
 def get_language_detection_service():
-    return LanguageDetectionService()
+    global _language_detection_service
+    if _language_detection_service is None:
+        _language_detection_service = LanguageDetectionService(languages=_configured_languages())
+    return _language_detection_service
@@ -144,7 +144,12 @@ def create_lead(data: LeadCreate) -> dict:
                     f"Telefon: {data.phone or '-'}\n\n"
                     f"Mesaj:\n{data.message}"
                 )
-                if svc.send_email(NOTIFY_EMAIL, subject, body, is_html=False):
+                from services.email_queue import is_email_queue_enabled, enqueue_email
+
+                if is_email_queue_enabled():
+                    enqueue_email(NOTIFY_EMAIL, subject, body, is_html=False)
+                    logger.info("Lead bildirimi email kuyruğuna eklendi.")
+                elif svc.send_email(NOTIFY_EMAIL, subject, body, is_html=False):
                     logger.info("Lead bildirimi info@heni.com.tr'ye gönderildi.")
                 else:
                     logger.warning("Lead bildirimi gönderilemedi (SMTP hatası).")
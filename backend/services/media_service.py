@@ -1,20 +1,51 @@
 """
 Media Service
 Handles media uploads and normalization for messages
+With MEDIA_DEDUP_ENABLED uploads are content-addressed: bytes are stored once per
+SHA-256 (media_objects index) and repeated uploads reuse the stored object
+Base64 attachments are decoded incrementally into a spooled temporary file (size
+limit checked before decoding); large files go up via resumable chunked upload
 """
-import base64
+import asyncio
+import binascii
+import hashlib
 import logging
 import mimetypes
 import os
 import uuid
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import List, Optional, Dict, Any, NamedTuple
+from urllib.parse import quote
 
 import httpx
 
 from services.supabase_client import supabase
+from services.settings import get_settings
+from services.resumable_upload import upload_resumable
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_UPLOAD_WORKERS = 4
+DEFAULT_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+DEFAULT_SPOOL_MEMORY_BYTES = 1024 * 1024
+# Supabase recommends resumable uploads above 6 MB
+DEFAULT_RESUMABLE_THRESHOLD_BYTES = 6 * 1024 * 1024
+
+# Base64 characters decoded per step (multiple of 4)
+_DECODE_CHUNK_CHARS = 256 * 1024
+_BASE64_WHITESPACE = b" \t\r\n"
+
+
+class MediaTooLarge(Exception):
+    """Attachment exceeds MEDIA_MAX_UPLOAD_BYTES"""
+
+
+class DecodedMedia(NamedTuple):
+    file: SpooledTemporaryFile
+    size: int
+    sha256: str
+
 
 class MediaService:
     """
@@ -22,7 +53,18 @@ class MediaService:
     """
 
     def __init__(self):
-        self.bucket = os.getenv("SUPABASE_MEDIA_BUCKET", "message-media")
+        # Storage uploads of one message run in parallel, bounded across all requests
+        self._upload_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("MEDIA_UPLOAD_WORKERS", str(DEFAULT_UPLOAD_WORKERS))),
+            thread_name_prefix="media-upload"
+        )
+        self.max_upload_bytes = int(os.getenv("MEDIA_MAX_UPLOAD_BYTES", str(DEFAULT_MAX_UPLOAD_BYTES)))
+        self.spool_memory_bytes = int(os.getenv("MEDIA_SPOOL_MEMORY_BYTES", str(DEFAULT_SPOOL_MEMORY_BYTES)))
+        self.resumable_threshold_bytes = int(os.getenv("MEDIA_RESUMABLE_THRESHOLD_BYTES", str(DEFAULT_RESUMABLE_THRESHOLD_BYTES)))
+
+    @property
+    def bucket(self) -> str:
+        return get_settings().media_bucket
 
     def _sanitize_filename(self, filename: str) -> str:
         safe = "".join(c if c.isalnum() or c in ("-", "_", ".") else "_" for c in filename)
@@ -34,32 +76,146 @@ class MediaService:
         ext = mimetypes.guess_extension(content_type)
         return ext or ""
 
-    def _decode_base64(self, data: str) -> bytes:
-        if "," in data:
-            data = data.split(",", 1)[1]
-        return base64.b64decode(data)
+    def _decode_base64_to_file(self, data: str) -> DecodedMedia:
+        """
+        Decode base64 (optionally a data: URL) chunk by chunk into a spooled temp file
+        Small files stay in memory, larger ones spill to disk; the SHA-256 is computed on the way
 
-    def _upload_bytes(self, data: bytes, content_type: Optional[str], filename: str, conversation_id: str) -> Optional[Dict[str, Any]]:
-        safe_name = self._sanitize_filename(filename)
-        path = f"conversations/{conversation_id}/{uuid.uuid4().hex}-{safe_name}"
+        Raises:
+            MediaTooLarge: Decoded size exceeds max_upload_bytes (checked before decoding)
+            binascii.Error: Invalid base64
+        """
+        # Skip a data:<type>;base64, prefix (base64 itself has no commas)
+        start = data.find(",") + 1
+        approx_size = (len(data) - start - data.count("\n", start)) * 3 // 4
+        if approx_size > self.max_upload_bytes + 2:
+            raise MediaTooLarge(f"Attachment of ~{approx_size} bytes exceeds {self.max_upload_bytes}")
+
+        spool = SpooledTemporaryFile(max_size=self.spool_memory_bytes)
+        hasher = hashlib.sha256()
+        size = 0
+        carry = b""
         try:
-            response = supabase.storage.from_(self.bucket).upload(
-                path,
-                data,
-                {"content-type": content_type or "application/octet-stream"}
+            for offset in range(start, len(data), _DECODE_CHUNK_CHARS):
+                chunk = carry + data[offset:offset + _DECODE_CHUNK_CHARS].encode("ascii").translate(None, _BASE64_WHITESPACE)
+                aligned = len(chunk) - len(chunk) % 4
+                carry = chunk[aligned:]
+                decoded = binascii.a2b_base64(chunk[:aligned])
+                size += len(decoded)
+                if size > self.max_upload_bytes:
+                    raise MediaTooLarge(f"Attachment exceeds {self.max_upload_bytes} bytes")
+                hasher.update(decoded)
+                spool.write(decoded)
+            if carry:
+                decoded = binascii.a2b_base64(carry + b"=" * (-len(carry) % 4))
+                size += len(decoded)
+                hasher.update(decoded)
+                spool.write(decoded)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return DecodedMedia(spool, size, hasher.hexdigest())
+
+    def _store(self, path: str, media: DecodedMedia, content_type: Optional[str], upsert: bool):
+        """
+        Upload to Storage: one request for small files, resumable chunks for large ones
+
+        Raises:
+            Exception: Upload failed
+        """
+        if media.size > self.resumable_threshold_bytes:
+            upload_resumable(media.file, media.size, self.bucket, path, content_type, upsert=upsert)
+            return
+        media.file.seek(0)
+        file_options = {"content-type": content_type or "application/octet-stream"}
+        if upsert:
+            file_options["upsert"] = "true"
+        response = supabase.storage.from_(self.bucket).upload(path, media.file.read(), file_options)
+        if not response:
+            raise Exception("Supabase upload failed without response")
+
+    def _public_url(self, path: str) -> Optional[str]:
+        """
+        Public object URL, built locally for public buckets (no Storage round trip)
+        """
+        settings = get_settings()
+        if settings.media_bucket_public and settings.supabase_url:
+            return (
+                f"{settings.supabase_url.rstrip('/')}/storage/v1/object/public/"
+                f"{quote(self.bucket)}/{quote(path)}"
             )
-            if not response:
-                logger.error("Supabase upload failed without response")
-                return None
-            public = supabase.storage.from_(self.bucket).get_public_url(path)
-            public_url = public.get("publicURL") or public.get("publicUrl") or public.get("public_url")
+        public = supabase.storage.from_(self.bucket).get_public_url(path)
+        if isinstance(public, str):
+            return public
+        return public.get("publicURL") or public.get("publicUrl") or public.get("public_url")
+
+    def _object_path(self, digest: str, safe_name: str, content_type: Optional[str]) -> str:
+        ext = os.path.splitext(safe_name)[1].lower() or self._guess_extension(content_type)
+        return f"objects/{digest[:2]}/{digest}{ext}"
+
+    def _reuse_object(self, digest: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored object for this content (reference is counted), or None
+        """
+        try:
+            response = supabase.rpc("reuse_media_object", {
+                'p_sha256': digest,
+                'p_bucket': self.bucket,
+            }).execute()
+        except Exception as e:
+            logger.warning(f"Media dedup lookup failed, uploading: {e}")
+            return None
+        return response.data[0] if response.data else None
+
+    def _register_object(self, digest: str, path: str, size: int,
+                         content_type: Optional[str], public_url: Optional[str]):
+        try:
+            supabase.table("media_objects").upsert({
+                'sha256': digest,
+                'bucket': self.bucket,
+                'path': path,
+                'size': size,
+                'content_type': content_type,
+                'public_url': public_url,
+            }, on_conflict="sha256", ignore_duplicates=True, returning="minimal").execute()
+        except Exception as e:
+            # Object is stored either way; the next upload just stores it again
+            logger.warning(f"Could not index media object {digest}: {e}")
+
+    def _upload_file(self, media: DecodedMedia, content_type: Optional[str], filename: str, conversation_id: str) -> Optional[Dict[str, Any]]:
+        safe_name = self._sanitize_filename(filename)
+        dedup = get_settings().media_dedup_enabled
+        digest = media.sha256 if dedup else None
+
+        if digest:
+            existing = self._reuse_object(digest)
+            if existing:
+                # Same bytes already stored: metadata only, nothing is uploaded
+                logger.info(f"Reusing stored media {existing['path']} for {safe_name}")
+                return {
+                    "url": existing.get("public_url") or self._public_url(existing["path"]),
+                    "name": safe_name,
+                    "type": content_type,
+                    "size": media.size,
+                    "path": existing["path"]
+                }
+            path = self._object_path(digest, safe_name, content_type)
+        else:
+            path = f"conversations/{conversation_id}/{uuid.uuid4().hex}-{safe_name}"
+
+        try:
+            self._store(path, media, content_type, upsert=bool(digest))
+            public_url = self._public_url(path)
             if not public_url:
                 logger.warning("Public URL not available for uploaded media")
+            if digest:
+                self._register_object(digest, path, media.size, content_type, public_url)
             return {
                 "url": public_url,
                 "name": safe_name,
                 "type": content_type,
-                "size": len(data),
+                "size": media.size,
                 "path": path
             }
         except Exception as e:
@@ -78,60 +234,90 @@ class MediaService:
             logger.error(f"Error downloading media from {url}: {e}")
             return None
 
+    @staticmethod
+    def _as_dict(item: Any) -> Dict[str, Any]:
+        if isinstance(item, dict):
+            return item
+        if hasattr(item, "model_dump"):
+            return item.model_dump()
+        if hasattr(item, "dict"):
+            return item.dict()
+        return dict(item.__dict__)
+
+    def _process_item(self, item: Dict[str, Any], conversation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Normalize one attachment, uploading inline base64 data
+
+        Returns:
+            Media entry, or None if the item failed
+        """
+        url = item.get("url")
+        data = item.get("data")
+        name = item.get("name") or item.get("filename") or f"media-{uuid.uuid4().hex}"
+        content_type = item.get("type") or item.get("content_type") or "application/octet-stream"
+
+        if url and not data:
+            return {
+                "url": url,
+                "name": name,
+                "type": content_type,
+                "size": item.get("size")
+            }
+
+        if data:
+            try:
+                media = self._decode_base64_to_file(data)
+            except MediaTooLarge as e:
+                logger.warning(f"Skipping attachment {name}: {e}")
+                return None
+            except Exception as e:
+                logger.error(f"Failed to decode base64 media: {e}")
+                return None
+            with media.file:
+                uploaded = self._upload_file(media, content_type, name, conversation_id)
+            if uploaded:
+                return {
+                    "url": uploaded.get("url"),
+                    "name": uploaded.get("name"),
+                    "type": uploaded.get("type"),
+                    "size": uploaded.get("size")
+                }
+        return None
+
     def process_attachments(self, attachments: Optional[List[Dict[str, Any]]], conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Normalize attachments; uploads run concurrently on a bounded pool
+
+        Args:
+            attachments: Incoming attachments (url and/or base64 data)
+            conversation_id: Conversation the media belongs to (storage folder)
+
+        Returns:
+            Media entries in input order (failed items left out), or None
+        """
         if not attachments:
             return None
 
-        processed: List[Dict[str, Any]] = []
-        for item in attachments:
-            if not isinstance(item, dict):
-                if hasattr(item, "model_dump"):
-                    item = item.model_dump()
-                elif hasattr(item, "dict"):
-                    item = item.dict()
-                else:
-                    item = dict(item.__dict__)
-
-            url = item.get("url")
-            data = item.get("data")
-            name = item.get("name") or item.get("filename") or f"media-{uuid.uuid4().hex}"
-            content_type = item.get("type") or item.get("content_type") or "application/octet-stream"
-
-            if url and not data:
-                processed.append({
-                    "url": url,
-                    "name": name,
-                    "type": content_type,
-                    "size": item.get("size")
-                })
-                continue
-
-            if data:
-                try:
-                    binary = self._decode_base64(data)
-                    uploaded = self._upload_bytes(binary, content_type, name, conversation_id)
-                    if uploaded:
-                        processed.append({
-                            "url": uploaded.get("url"),
-                            "name": uploaded.get("name"),
-                            "type": uploaded.get("type"),
-                            "size": uploaded.get("size")
-                        })
-                    continue
-                except Exception as e:
-                    logger.error(f"Failed to decode base64 media: {e}")
-                    continue
-
-            if url and data:
-                processed.append({
-                    "url": url,
-                    "name": name,
-                    "type": content_type,
-                    "size": item.get("size")
-                })
+        items = [self._as_dict(item) for item in attachments]
+        uploads = sum(1 for item in items if item.get("data"))
+        if uploads > 1:
+            results = list(self._upload_executor.map(
+                lambda item: self._process_item(item, conversation_id), items
+            ))
+        else:
+            results = [self._process_item(item, conversation_id) for item in items]
 
+        processed = [result for result in results if result is not None]
         return processed or None
 
+    async def aprocess_attachments(self, attachments: Optional[List[Dict[str, Any]]], conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        process_attachments without blocking the event loop
+        """
+        if not attachments:
+            return None
+        return await asyncio.to_thread(self.process_attachments, attachments, conversation_id)
+
 
 _media_service: Optional[MediaService] = None
 
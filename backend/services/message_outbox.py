@@ -0,0 +1,357 @@
+"""
+Message Outbox
+Transactional outbox for agent message delivery
+/api/messages/send stores the message and an outbox row in one RPC call and
+returns; MessageOutboxWorker claims due rows, translates, sends via
+EmailService/WhatsAppService, retries with backoff and records
+messages.delivery_status
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List
+from services.supabase_client import supabase
+from services.conversation_context import ConversationContext, load_conversation_context
+from services.translation_service import get_translation_service
+from services.settings import get_settings
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment)
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_CONCURRENCY = 4
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_BACKOFF_SECONDS = 5.0
+DEFAULT_MAX_BACKOFF_SECONDS = 600.0
+DEFAULT_STALE_LOCK_SECONDS = 300
+
+# messages.delivery_status values
+DELIVERY_PENDING = "pending"
+DELIVERY_SENT = "sent"
+DELIVERY_FAILED = "failed"
+DELIVERY_BLOCKED = "blocked"
+DELIVERY_SKIPPED = "skipped"
+
+
+def is_outbox_enabled() -> bool:
+    """
+    Check if agent sends go through the outbox (MESSAGE_OUTBOX_ENABLED=true)
+    """
+    return get_settings().message_outbox_enabled
+
+
+class DeliveryError(Exception):
+    """Channel send failed; the outbox row is retried"""
+
+
+def enqueue_agent_message(context: ConversationContext, turkish_content: str,
+                          raw_content: str, media: Optional[list],
+                          translated_content: Optional[str] = None,
+                          customer_language: Optional[str] = None,
+                          deliver: bool = True) -> Dict[str, Any]:
+    """
+    Store an agent message and its delivery job in one transaction
+
+    Args:
+        context: Conversation context of the send
+        turkish_content: Message content in Turkish (stored as the message)
+        raw_content: Text the agent typed ('' for media-only messages)
+        media: Attachments
+        translated_content: Already translated text (e.g. canned response), optional
+        customer_language: Target language for delivery
+        deliver: False if the reply is blocked (message is stored without an outbox row)
+
+    Returns:
+        Created message row
+    """
+    deliverable = deliver and context.channel in ('email', 'whatsapp')
+    payload = None
+    if deliverable:
+        payload = {
+            'turkish_content': turkish_content,
+            'raw_content': raw_content,
+            'translated_content': translated_content,
+            'customer_language': customer_language,
+            'media': media or [],
+        }
+
+    if not deliver:
+        delivery_status = DELIVERY_BLOCKED
+    elif deliverable:
+        delivery_status = DELIVERY_PENDING
+    else:
+        delivery_status = DELIVERY_SKIPPED
+
+    response = supabase.rpc("enqueue_agent_message", {
+        'p_conversation_id': context.conversation_id,
+        'p_content': turkish_content,
+        'p_media': media,
+        'p_channel': context.channel,
+        'p_payload': payload,
+        'p_delivery_status': delivery_status,
+    }).execute()
+
+    message = response.data[0] if isinstance(response.data, list) else response.data
+    if not message:
+        raise Exception(f"Enqueue failed: {response}")
+    if deliverable:
+        get_message_outbox_worker().notify()
+    return message
+
+
+class MessageOutboxWorker:
+    """
+    Drains message_outbox in the backend process
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+                 max_backoff_seconds: float = DEFAULT_MAX_BACKOFF_SECONDS,
+                 stale_lock_seconds: int = DEFAULT_STALE_LOCK_SECONDS):
+        """
+        Initialize outbox worker
+
+        Args:
+            batch_size: Rows claimed per poll
+            concurrency: Deliveries in flight at once
+            poll_seconds: Idle poll interval (enqueues in this process wake the worker at once)
+            max_attempts: Attempts before a delivery is marked failed
+            backoff_seconds: First retry delay (doubles per attempt)
+            max_backoff_seconds: Retry delay cap
+            stale_lock_seconds: Reclaim rows left 'processing' by a crashed worker after this long
+        """
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.stale_lock_seconds = stale_lock_seconds
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    def notify(self):
+        """
+        Wake the worker (safe to call from any thread)
+        """
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def stop(self):
+        self._stopping = True
+        self.notify()
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Retry delay after `attempts` failed attempts
+        """
+        return min(self.max_backoff_seconds, self.backoff_seconds * (2 ** max(0, attempts - 1)))
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        response = supabase.rpc("claim_message_outbox", {
+            'p_limit': self.batch_size,
+            'p_stale_seconds': self.stale_lock_seconds,
+        }).execute()
+        return response.data or []
+
+    def _finish(self, row: Dict[str, Any], outbox_status: str, delivery_status: Optional[str],
+                error: Optional[str] = None, retry_in: Optional[float] = None):
+        now = datetime.now(timezone.utc)
+        update: Dict[str, Any] = {
+            'status': outbox_status,
+            'last_error': error,
+            'locked_at': None,
+            'updated_at': now.isoformat(),
+        }
+        if retry_in is not None:
+            update['next_attempt_at'] = (now + timedelta(seconds=retry_in)).isoformat()
+        supabase.table("message_outbox").update(update).eq('id', row['id']).execute()
+
+        if delivery_status:
+            (
+                supabase
+                .table("messages")
+                .update({'delivery_status': delivery_status})
+                .eq('id', row['message_id'])
+                .execute()
+            )
+
+    async def _send(self, row: Dict[str, Any]) -> str:
+        """
+        Deliver one outbox row
+
+        Returns:
+            Final delivery status (sent, blocked, skipped; pending if handed to the email queue)
+
+        Raises:
+            DeliveryError: Channel send failed (retried)
+        """
+        payload = row.get('payload') or {}
+        context = await asyncio.to_thread(load_conversation_context, row['conversation_id'])
+        if context is None:
+            return DELIVERY_SKIPPED
+
+        turkish_content = payload.get('turkish_content') or ""
+        raw_content = payload.get('raw_content') or ""
+        media = payload.get('media') or []
+        translated = payload.get('translated_content')
+        language = payload.get('customer_language') or context.customer_language
+        language_known = bool(language) and language != 'unknown'
+
+        needs_text = row['channel'] == 'email' or bool(raw_content)
+        if translated is None and needs_text and language_known and language != 'tr':
+            translated = await get_translation_service().atranslate(
+                turkish_content,
+                source_language='tr',
+                target_language=language
+            )
+
+        if row['channel'] == 'email':
+            if not context.customer_email:
+                return DELIVERY_SKIPPED
+            if not language_known:
+                return DELIVERY_BLOCKED
+
+            from services.email_service import get_email_service
+            email_service = get_email_service()
+            if not email_service.is_configured():
+                raise DeliveryError("Email service is not configured")
+            sent = await email_service.asend_translated_reply(
+                to_email=context.customer_email,
+                customer_name=context.customer_name,
+                turkish_message=turkish_content,
+                target_language=language,
+                original_language='tr',
+                original_subject=None,
+                message_id=context.last_customer_message_id,
+                attachments=media,
+                translated_message=translated,
+                crm_message_id=row['message_id']
+            )
+            if not sent:
+                raise DeliveryError(f"Email to {context.customer_email} was not sent")
+            from services.email_queue import is_email_queue_enabled
+            # Queued: the email queue records sent/failed itself
+            return DELIVERY_PENDING if is_email_queue_enabled() else DELIVERY_SENT
+
+        if row['channel'] == 'whatsapp':
+            if not context.customer_phone:
+                return DELIVERY_SKIPPED
+            text = raw_content
+            if raw_content and not language_known:
+                # Text is blocked, media still goes out (same as inline sends)
+                if not media:
+                    return DELIVERY_BLOCKED
+                text = ""
+            elif raw_content and language != 'tr':
+                text = translated or raw_content
+
+            from services.whatsapp_service import get_whatsapp_service
+            result = await get_whatsapp_service().send_message(context.customer_phone, text or "", media=media)
+            if not result.get('success'):
+                raise DeliveryError(f"WhatsApp send failed: {result.get('error')}")
+            return DELIVERY_SENT
+
+        return DELIVERY_SKIPPED
+
+    async def _deliver(self, row: Dict[str, Any]):
+        try:
+            status = await self._send(row)
+            # Leave a pending status alone so it cannot overwrite the email queue's result
+            await asyncio.to_thread(self._finish, row, 'done', None if status == DELIVERY_PENDING else status)
+            self.delivered += 1
+            logger.info(f"Outbox delivery {row['id']} for message {row['message_id']}: {status}")
+        except Exception as e:
+            attempts = row.get('attempts') or 1
+            try:
+                if attempts >= self.max_attempts:
+                    await asyncio.to_thread(self._finish, row, 'failed', DELIVERY_FAILED, str(e))
+                    self.failed += 1
+                    logger.error(f"Outbox delivery {row['id']} failed after {attempts} attempts: {e}")
+                else:
+                    delay = self.backoff(attempts)
+                    await asyncio.to_thread(self._finish, row, 'pending', None, str(e), delay)
+                    self.retried += 1
+                    logger.warning(f"Outbox delivery {row['id']} attempt {attempts} failed, retrying in {delay:.0f}s: {e}")
+            except Exception as store_error:
+                # Row stays 'processing' and is reclaimed after the stale lock timeout
+                logger.error(f"Could not record outbox result for {row['id']}: {store_error}")
+
+    async def drain_once(self) -> int:
+        """
+        Claim and deliver one batch
+
+        Returns:
+            Number of rows processed
+        """
+        rows = await asyncio.to_thread(self._claim)
+        if not rows:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(row: Dict[str, Any]):
+            async with semaphore:
+                await self._deliver(row)
+
+        await asyncio.gather(*[deliver(row) for row in rows])
+        return len(rows)
+
+    async def run(self):
+        """
+        Worker loop; drains until the outbox is empty, then waits for a poll or a notify()
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        logger.info("Message outbox worker started")
+
+        while not self._stopping:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Message outbox poll failed: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+        logger.info("Message outbox worker stopped")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Delivery counters since start
+        """
+        return {"delivered": self.delivered, "retried": self.retried, "failed": self.failed}
+
+
+# Singleton instance
+_message_outbox_worker = None
+
+
+def get_message_outbox_worker() -> MessageOutboxWorker:
+    """Get singleton instance of MessageOutboxWorker"""
+    global _message_outbox_worker
+    if _message_outbox_worker is None:
+        _message_outbox_worker = MessageOutboxWorker(
+            batch_size=int(os.getenv("MESSAGE_OUTBOX_BATCH_SIZE", str(DEFAULT_BATCH_SIZE))),
+            concurrency=int(os.getenv("MESSAGE_OUTBOX_CONCURRENCY", str(DEFAULT_CONCURRENCY))),
+            poll_seconds=float(os.getenv("MESSAGE_OUTBOX_POLL_SECONDS", str(DEFAULT_POLL_SECONDS))),
+            max_attempts=int(os.getenv("MESSAGE_OUTBOX_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS))),
+            backoff_seconds=float(os.getenv("MESSAGE_OUTBOX_BACKOFF_SECONDS", str(DEFAULT_BACKOFF_SECONDS))),
+        )
+    return _message_outbox_worker
@@ -6,8 +6,9 @@ from typing import Optional, Dict
 from services.supabase_client import supabase
 from services.language_detection import get_language_detection_service
 from services.translation_service import get_translation_service
+from services.conversation_context import ConversationContext, load_conversation_context
+import asyncio
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +25,8 @@ class MessageService:
                                 original_content: Optional[str] = None,
                                 original_language: Optional[str] = None,
                                 customer_email: Optional[str] = None,
-                                media: Optional[list] = None) -> Optional[Dict]:
+                                media: Optional[list] = None,
+                                translation_status: Optional[str] = None) -> Optional[Dict]:
         """
         Create a customer message with translation support
         
@@ -34,6 +36,7 @@ class MessageService:
             original_content: Original message content in customer's language
             original_language: ISO 639-1 language code of original message (e.g., 'en', 'de', 'fr')
             customer_email: Customer email (for future use)
+            translation_status: 'pending' if translation is deferred to the background worker
             
         Returns:
             Created message dictionary or None if failed
@@ -47,8 +50,9 @@ class MessageService:
             if original_language is None:
                 original_language = 'tr'
             
-            # translated_content is the same as content (Turkish version)
-            translated_content = content
+            # translated_content is the same as content (Turkish version),
+            # unless translation is still pending
+            translated_content = None if translation_status == 'pending' else content
             
             # Insert message into database
             message_data = {
@@ -61,6 +65,8 @@ class MessageService:
                 'is_read': False,
                 'media': media
             }
+            if translation_status:
+                message_data['translation_status'] = translation_status
             
             response = (
                 supabase
@@ -79,18 +85,24 @@ class MessageService:
             logger.error(f"Error creating customer message: {e}")
             raise
     
-    def create_agent_message(self, conversation_id: str, turkish_content: str,
+    async def create_agent_message(self, conversation_id: str, turkish_content: str,
                             customer_language: Optional[str] = None,
                             customer_email: Optional[str] = None,
-                            media: Optional[list] = None) -> Dict:
+                            media: Optional[list] = None,
+                            translated_content: Optional[str] = None,
+                            context: Optional[ConversationContext] = None) -> Dict:
         """
         Create an agent message (in Turkish) and optionally send translated version to customer
+        Database calls run in worker threads and the email reply is sent on the SMTP pool
+        and awaited, so the event loop is never blocked
         
         Args:
             conversation_id: Conversation ID
             turkish_content: Message content in Turkish (from agent)
             customer_language: Customer's original language (for translation)
             customer_email: Customer email (for sending reply)
+            translated_content: Content already translated to customer_language (optional, skips translation)
+            context: Conversation context already loaded by the caller (optional, saves a query)
             
         Returns:
             Created message dictionary with email_sent flag
@@ -110,11 +122,13 @@ class MessageService:
                 'media': media
             }
             
-            response = (
-                supabase
-                .table("messages")
-                .insert(message_data)
-                .execute()
+            response = await asyncio.to_thread(
+                lambda: (
+                    supabase
+                    .table("messages")
+                    .insert(message_data)
+                    .execute()
+                )
             )
             
             if not response.data:
@@ -127,42 +141,17 @@ class MessageService:
                 
                 # Check configuration with detailed logging
                 if not email_service.is_configured():
-                    logger.error("Email service is not configured. Please check SMTP settings in .env file")
-                    logger.error(f"SMTP_SERVER: {os.getenv('SMTP_SERVER')}")
-                    logger.error(f"SMTP_PORT: {os.getenv('SMTP_PORT')}")
-                    logger.error(f"SMTP_USERNAME: {os.getenv('SMTP_USERNAME')}")
-                    logger.error(f"SMTP_PASSWORD: {'***' if os.getenv('SMTP_PASSWORD') else 'NOT SET'}")
+                    logger.error(f"Email service is not configured. Please check SMTP settings in .env file: {email_service.smtp.describe()}")
                 
                 if email_service.is_configured():
                     try:
-                        # Get conversation details to check channel and customer name
-                        conv_response = (
-                            supabase
-                            .table("conversations")
-                            .select("customer_id, channel")
-                            .eq("id", conversation_id)
-                            .execute()
-                        )
+                        # Channel, customer name and threading id come from one context query
+                        if context is None:
+                            context = await asyncio.to_thread(load_conversation_context, conversation_id)
                         
                         # Only send email if conversation channel is "email"
-                        is_email_channel = False
-                        customer_name = "Customer"
-                        
-                        if conv_response.data and len(conv_response.data) > 0:
-                            conv_data = conv_response.data[0]
-                            is_email_channel = conv_data.get('channel') == 'email'
-                            
-                            customer_id = conv_data.get('customer_id')
-                            if customer_id:
-                                customer_response = (
-                                    supabase
-                                    .table("customers")
-                                    .select("name")
-                                    .eq("id", customer_id)
-                                    .execute()
-                                )
-                                if customer_response.data and len(customer_response.data) > 0:
-                                    customer_name = customer_response.data[0].get('name', 'Customer')
+                        is_email_channel = bool(context) and context.channel == 'email'
+                        customer_name = context.customer_name if context else "Customer"
                         
                         # Send email reply if this is an email conversation
                         if is_email_channel:
@@ -176,36 +165,19 @@ class MessageService:
                             
                             if target_language:
                                 logger.info(f"Translating agent message from Turkish to {target_language} for customer {customer_email}")
-                            
-                            # Get last customer message for threading (optional)
-                            last_customer_msg = None
-                            try:
-                                msg_response = (
-                                    supabase
-                                    .table("messages")
-                                    .select("id")
-                                    .eq("conversation_id", conversation_id)
-                                    .eq("sender", "customer")
-                                    .order("sent_at", desc=True)
-                                    .limit(1)
-                                    .execute()
-                                )
-                                if msg_response.data and len(msg_response.data) > 0:
-                                    last_customer_msg = msg_response.data[0]
-                            except Exception as e:
-                                logger.warning(f"Could not get last customer message for threading: {e}")
-                            
-                            if target_language:
+                                
                                 # Send translated email
-                                email_sent_result = email_service.send_translated_reply(
+                                email_sent_result = await email_service.asend_translated_reply(
                                     to_email=customer_email,
                                     customer_name=customer_name,
                                     turkish_message=turkish_content,
                                     target_language=target_language,
                                     original_language='tr',
                                     original_subject=None,  # Can be enhanced to get from conversation metadata
-                                    message_id=last_customer_msg.get('id') if last_customer_msg else None,
-                                    attachments=media
+                                    message_id=context.last_customer_message_id,
+                                    attachments=media,
+                                    translated_message=translated_content,
+                                    crm_message_id=response.data[0].get('id')
                                 )
                                 
                                 email_sent = email_sent_result
@@ -226,40 +198,7 @@ class MessageService:
         except Exception as e:
             logger.error(f"Error creating agent message: {e}")
             raise
-    
-    def get_customer_language(self, conversation_id: str) -> Optional[str]:
-        """
-        Get the original language of customer messages in a conversation
-        
-        Args:
-            conversation_id: Conversation ID
-            
-        Returns:
-            Language code or None if not found
-        """
-        try:
-            response = (
-                supabase
-                .table("messages")
-                .select("original_language, content, original_content")
-                .eq("conversation_id", conversation_id)
-                .eq("sender", "customer")
-                .order("sent_at", desc=True)
-                .limit(1)
-                .execute()
-            )
-            
-            if response.data and len(response.data) > 0:
-                original_language = response.data[0].get('original_language')
-                logger.info(f"Found customer language for conversation {conversation_id}: {original_language}")
-                return original_language
-            
-            logger.warning(f"No customer messages found for conversation {conversation_id}")
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error getting customer language: {e}", exc_info=True)
-            return None
+
 
 # Singleton instance
 _message_service = None
@@ -0,0 +1,116 @@
+"""
+Resumable Upload
+TUS client for Supabase Storage resumable uploads (/storage/v1/upload/resumable)
+Large media is sent in fixed-size chunks read from a file, so memory use stays at
+one chunk per upload; a failed chunk is resumed from the offset the server reports
+"""
+from typing import BinaryIO, Dict, Optional
+import base64
+import logging
+import time
+
+import httpx
+
+from services.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+# Supabase Storage requires 6 MB chunks for resumable uploads
+DEFAULT_CHUNK_SIZE = 6 * 1024 * 1024
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_DELAY_SECONDS = 1.0
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+
+class ResumableUploadError(Exception):
+    """Resumable upload could not be completed"""
+
+
+def _metadata(values: Dict[str, str]) -> str:
+    return ",".join(
+        f"{key} {base64.b64encode(value.encode('utf-8')).decode('ascii')}"
+        for key, value in values.items()
+    )
+
+
+def upload_resumable(fileobj: BinaryIO, size: int, bucket: str, path: str,
+                     content_type: Optional[str] = None, upsert: bool = False,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     retries: int = DEFAULT_RETRIES,
+                     timeout: float = DEFAULT_TIMEOUT_SECONDS):
+    """
+    Upload a file to Supabase Storage in chunks
+
+    Args:
+        fileobj: Seekable binary file positioned anywhere (it is read from offset 0)
+        size: Total bytes
+        bucket: Storage bucket
+        path: Object path inside the bucket
+        content_type: MIME type stored with the object
+        upsert: Overwrite an existing object
+        chunk_size: Bytes per PATCH request
+        retries: Resume attempts per failed chunk
+        timeout: HTTP timeout per request in seconds
+
+    Raises:
+        ResumableUploadError: Upload could not be created or completed
+    """
+    settings = get_settings()
+    if not settings.supabase_url or not settings.supabase_service_role_key:
+        raise ResumableUploadError("Supabase settings are missing")
+
+    endpoint = f"{settings.supabase_url.rstrip('/')}/storage/v1/upload/resumable"
+    headers = {
+        "Authorization": f"Bearer {settings.supabase_service_role_key}",
+        "apikey": settings.supabase_service_role_key,
+        "Tus-Resumable": TUS_VERSION,
+    }
+
+    with httpx.Client(timeout=timeout) as client:
+        create_headers = {
+            **headers,
+            "Upload-Length": str(size),
+            "Upload-Metadata": _metadata({
+                "bucketName": bucket,
+                "objectName": path,
+                "contentType": content_type or "application/octet-stream",
+                "cacheControl": "3600",
+            }),
+        }
+        if upsert:
+            create_headers["x-upsert"] = "true"
+        response = client.post(endpoint, headers=create_headers)
+        if response.status_code != 201 or not response.headers.get("Location"):
+            raise ResumableUploadError(f"Could not create upload: HTTP {response.status_code} {response.text[:200]}")
+        upload_url = response.headers["Location"]
+
+        offset = 0
+        failures = 0
+        while offset < size:
+            fileobj.seek(offset)
+            chunk = fileobj.read(chunk_size)
+            try:
+                response = client.patch(upload_url, content=chunk, headers={
+                    **headers,
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                })
+                if response.status_code != 204:
+                    raise ResumableUploadError(f"HTTP {response.status_code} {response.text[:200]}")
+                offset = int(response.headers.get("Upload-Offset", offset + len(chunk)))
+                failures = 0
+            except (httpx.HTTPError, ResumableUploadError) as e:
+                failures += 1
+                if failures > retries:
+                    raise ResumableUploadError(f"Upload of {path} failed at offset {offset}: {e}")
+                logger.warning(f"Chunk at offset {offset} of {path} failed ({e}), resuming")
+                time.sleep(DEFAULT_RETRY_DELAY_SECONDS * failures)
+                # Server may have stored part of the chunk
+                try:
+                    head = client.head(upload_url, headers=headers)
+                    offset = int(head.headers.get("Upload-Offset", offset))
+                except (httpx.HTTPError, ValueError):
+                    pass
+
+    logger.info(f"Resumable upload of {path} complete ({size} bytes)")
@@ -0,0 +1,167 @@
+"""
+Settings
+Typed, immutable application settings built once from the environment and backend/.env
+Services read get_settings() instead of calling load_dotenv()/os.getenv on every request;
+reload_settings() (POST /api/admin/settings/reload) re-reads .env explicitly
+Variables set in the real process environment always win over .env
+"""
+from dataclasses import dataclass, fields
+from typing import Optional, Dict, Any, List
+import logging
+import os
+import threading
+
+from dotenv import dotenv_values
+
+logger = logging.getLogger(__name__)
+
+ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+
+DEFAULT_SMTP_PORT = 465
+DEFAULT_FROM_NAME = "CRM System"
+DEFAULT_MEDIA_BUCKET = "message-media"
+DEFAULT_WHATSAPP_SERVICE_URL = "http://whatsapp-service:3001"
+DEFAULT_ADMIN_TOKEN = "change_this_secure_token"
+# Webhook bodies carry base64 attachments (~4/3 of the file size)
+DEFAULT_MAX_REQUEST_BYTES = 100 * 1024 * 1024
+
+# Keys present before .env was applied belong to the deployment and are never overwritten
+_PROCESS_ENV_KEYS = frozenset(os.environ)
+
+
+def _flag(name: str) -> bool:
+    return os.getenv(name, "false").lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class SMTPSettings:
+    """
+    Outgoing mail server
+    """
+    server: Optional[str] = None
+    port: int = DEFAULT_SMTP_PORT
+    username: Optional[str] = None
+    password: Optional[str] = None
+    from_email: Optional[str] = None
+    from_name: str = DEFAULT_FROM_NAME
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.username and self.password and self.server)
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Settings safe to log or return from an endpoint (no password)
+        """
+        return {
+            "smtp_server": self.server,
+            "smtp_port": self.port,
+            "smtp_username": self.username,
+            "from_email": self.from_email,
+            "from_name": self.from_name,
+            "has_password": bool(self.password),
+        }
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Application settings shared by all services
+    """
+    supabase_url: Optional[str] = None
+    supabase_service_role_key: Optional[str] = None
+    media_bucket: str = DEFAULT_MEDIA_BUCKET
+    media_bucket_public: bool = True
+    media_dedup_enabled: bool = False
+    whatsapp_service_url: str = DEFAULT_WHATSAPP_SERVICE_URL
+    admin_token: str = DEFAULT_ADMIN_TOKEN
+    smtp: SMTPSettings = SMTPSettings()
+    message_outbox_enabled: bool = False
+    email_queue_enabled: bool = False
+    deferred_translation: bool = False
+    max_request_bytes: int = DEFAULT_MAX_REQUEST_BYTES
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        username = os.getenv("SMTP_USERNAME")
+        return cls(
+            supabase_url=os.getenv("SUPABASE_URL"),
+            supabase_service_role_key=os.getenv("SUPABASE_SERVICE_ROLE_KEY"),
+            media_bucket=os.getenv("SUPABASE_MEDIA_BUCKET", DEFAULT_MEDIA_BUCKET),
+            media_bucket_public=os.getenv("SUPABASE_MEDIA_BUCKET_PUBLIC", "true").lower() not in ("0", "false", "no"),
+            media_dedup_enabled=_flag("MEDIA_DEDUP_ENABLED"),
+            whatsapp_service_url=os.getenv("WHATSAPP_SERVICE_URL", DEFAULT_WHATSAPP_SERVICE_URL),
+            admin_token=os.getenv("ADMIN_TOKEN", DEFAULT_ADMIN_TOKEN),
+            smtp=SMTPSettings(
+                server=os.getenv("SMTP_SERVER"),
+                port=int(os.getenv("SMTP_PORT", str(DEFAULT_SMTP_PORT))),
+                username=username,
+                password=os.getenv("SMTP_PASSWORD"),
+                from_email=os.getenv("FROM_EMAIL", username),
+                from_name=os.getenv("FROM_NAME", DEFAULT_FROM_NAME),
+            ),
+            message_outbox_enabled=_flag("MESSAGE_OUTBOX_ENABLED"),
+            email_queue_enabled=_flag("EMAIL_QUEUE_ENABLED"),
+            deferred_translation=_flag("DEFERRED_TRANSLATION"),
+            max_request_bytes=int(os.getenv("MAX_REQUEST_BYTES", str(DEFAULT_MAX_REQUEST_BYTES))),
+        )
+
+    def changed_fields(self, other: "Settings") -> List[str]:
+        """
+        Names of fields that differ from `other` (SMTP fields as smtp.<name>)
+        """
+        changed = []
+        for field in fields(self):
+            mine, theirs = getattr(self, field.name), getattr(other, field.name)
+            if isinstance(mine, SMTPSettings):
+                changed.extend(
+                    f"smtp.{f.name}" for f in fields(mine)
+                    if getattr(mine, f.name) != getattr(theirs, f.name)
+                )
+            elif mine != theirs:
+                changed.append(field.name)
+        return changed
+
+
+def _apply_env_file():
+    """
+    Copy backend/.env into os.environ (keys from the real environment are left alone)
+    Other modules still reading os.getenv see the same values as Settings
+    """
+    if not os.path.exists(ENV_PATH):
+        return
+    for key, value in dotenv_values(ENV_PATH).items():
+        if value is not None and key not in _PROCESS_ENV_KEYS:
+            os.environ[key] = value
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """Get the current Settings (built from the environment on first use)"""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _apply_env_file()
+                _settings = Settings.from_env()
+    return _settings
+
+
+def reload_settings() -> List[str]:
+    """
+    Re-read backend/.env and swap in a new Settings object
+
+    Returns:
+        Names of settings that changed
+    """
+    global _settings
+    with _settings_lock:
+        previous = _settings or Settings()
+        _apply_env_file()
+        _settings = Settings.from_env()
+    changed = _settings.changed_fields(previous)
+    logger.info(f"Settings reloaded, changed: {', '.join(changed) if changed else 'nothing'}")
+    return changed
@@ -0,0 +1,204 @@
+"""
+SMTP Connection Pool
+Keeps authenticated SMTP sessions open between sends
+- sessions idle longer than noop_after_seconds are checked with NOOP before reuse and
+  reopened when the server dropped them (back-to-back sends in a batch skip the NOOP)
+- each session is retired after max_messages sends or max_idle_seconds of idleness
+Port 587 uses STARTTLS, any other port SSL (same as EmailService)
+"""
+from email.message import Message
+from typing import Dict, List
+import logging
+import smtplib
+import ssl
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment)
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MAX_MESSAGES = 100
+DEFAULT_MAX_IDLE_SECONDS = 60.0
+DEFAULT_TIMEOUT_SECONDS = 10.0
+DEFAULT_NOOP_AFTER_SECONDS = 1.0
+
+
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+        self.reused = False
+
+
+class SMTPConnectionPool:
+    """
+    Small pool of authenticated SMTP sessions (thread-safe)
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str,
+                 size: int = DEFAULT_POOL_SIZE,
+                 max_messages: int = DEFAULT_MAX_MESSAGES,
+                 max_idle_seconds: float = DEFAULT_MAX_IDLE_SECONDS,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 noop_after_seconds: float = DEFAULT_NOOP_AFTER_SECONDS):
+        """
+        Initialize SMTP pool (connections are opened lazily)
+
+        Args:
+            host: SMTP server
+            port: SMTP port (587 = STARTTLS, otherwise SSL)
+            username: SMTP login
+            password: SMTP password
+            size: Max open sessions
+            max_messages: Messages per session before it is closed and replaced
+            max_idle_seconds: Sessions idle longer than this are closed instead of reused
+            timeout: Socket timeout in seconds
+            noop_after_seconds: Sessions idle at least this long are probed with NOOP before reuse
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = max(1, size)
+        self.max_messages = max(1, max_messages)
+        self.max_idle_seconds = max_idle_seconds
+        self.timeout = timeout
+        self.noop_after_seconds = noop_after_seconds
+
+        self._idle: List[_PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+        self.opened = 0
+        self.reused = 0
+        self.reconnects = 0
+        self.sent = 0
+
+    def _ssl_context(self) -> ssl.SSLContext:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _connect(self) -> _PooledConnection:
+        if self.port == 587:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.starttls(context=self._ssl_context())
+        else:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, context=self._ssl_context(), timeout=self.timeout)
+        try:
+            smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        self.opened += 1
+        logger.info(f"Opened SMTP session to {self.host}:{self.port}")
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(conn: _PooledConnection) -> bool:
+        try:
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> _PooledConnection:
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                idle_for = time.monotonic() - conn.last_used
+                if idle_for > self.max_idle_seconds or (idle_for >= self.noop_after_seconds and not self._is_alive(conn)):
+                    self._close(conn.smtp)
+                    continue
+                conn.reused = True
+                self.reused += 1
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: _PooledConnection, keep: bool = True):
+        try:
+            if keep and conn.sent < self.max_messages:
+                conn.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(conn)
+            else:
+                self._close(conn.smtp)
+        finally:
+            self._slots.release()
+
+    def send_message(self, msg: Message):
+        """
+        Send a message over a pooled session
+        A reused session the server dropped is replaced and the send retried once
+
+        Raises:
+            smtplib.SMTPException / OSError: Send failed
+        """
+        while True:
+            conn = self._acquire()
+            try:
+                conn.smtp.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._release(conn, keep=False)
+                if not conn.reused:
+                    raise
+                self.reconnects += 1
+                logger.info(f"SMTP session dropped by server ({e}), reconnecting")
+                continue
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # Session is still usable after a rejected message once reset
+                try:
+                    conn.smtp.rset()
+                    self._release(conn)
+                except Exception:
+                    self._release(conn, keep=False)
+                raise
+            except Exception:
+                self._release(conn, keep=False)
+                raise
+
+            conn.sent += 1
+            self.sent += 1
+            self._release(conn)
+            return
+
+    def close(self):
+        """
+        Close all idle sessions
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn.smtp)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Session counters
+        """
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "idle": idle,
+            "opened": self.opened,
+            "reused": self.reused,
+            "reconnects": self.reconnects,
+            "sent": self.sent,
+        }
@@ -1,11 +1,9 @@
-import os
 from supabase import create_client, Client
-from dotenv import load_dotenv
+from services.settings import get_settings
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+# Client is created once; changing Supabase settings needs a restart
+SUPABASE_URL = get_settings().supabase_url
+SUPABASE_KEY = get_settings().supabase_service_role_key
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise RuntimeError("Supabase env variables missing")
@@ -0,0 +1,385 @@
+"""
+Translation Backfill
+Re-detects and re-translates historical customer messages stored with
+original_language='unknown' or with translated_content equal to original_content
+Rows are streamed from the messages_needing_translation view with keyset
+pagination on id; progress is checkpointed so an interrupted run resumes
+
+Usage (from backend/):
+    python -m services.translation_backfill --rate 20 --batch-size 200
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+from services.supabase_client import supabase
+from services.translation_service import get_translation_service
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via CLI / endpoint)
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_RATE = 20.0  # messages per second
+DEFAULT_DETECT_WORKERS = 2
+DEFAULT_CHECKPOINT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "translation_backfill.json",
+)
+
+# Columns read from the view; NOT NULL columns are included so the bulk upsert is valid
+_COLUMNS = (
+    "id, conversation_id, sender, content, original_content,"
+    " original_language, translated_content, translation_status"
+)
+
+
+def _init_detect_worker():
+    # Load language profiles once per worker process
+    from services.language_detection import get_language_detection_service
+    get_language_detection_service().warm_up()
+
+
+def _detect_languages(texts: List[str]) -> List[str]:
+    """
+    Detect languages of a chunk of texts (runs in a worker process)
+    """
+    from services.language_detection import get_language_detection_service
+    detector = get_language_detection_service()
+    return [detector.detect_language(text) for text in texts]
+
+
+class TranslationBackfill:
+    """
+    Resumable batch job for historical message translations
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                 rate: float = DEFAULT_RATE,
+                 detect_workers: int = DEFAULT_DETECT_WORKERS,
+                 checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT_PATH,
+                 dry_run: bool = False):
+        """
+        Initialize backfill job
+
+        Args:
+            batch_size: Rows fetched, translated and written per round trip
+            rate: Throughput cap in messages/second (<= 0 for no cap)
+            detect_workers: Language detection worker processes
+            checkpoint_path: JSON checkpoint file (None disables resume)
+            dry_run: Detect and translate but do not write messages
+        """
+        self.batch_size = max(1, batch_size)
+        self.rate = rate
+        self.detect_workers = max(1, detect_workers)
+        self.checkpoint_path = checkpoint_path
+        self.dry_run = dry_run
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._progress: Dict[str, Any] = {"state": "idle"}
+
+    def load_checkpoint(self) -> Dict[str, Any]:
+        """
+        Read last checkpoint ({} if none)
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read backfill checkpoint ({e}), starting over")
+            return {}
+
+    def save_checkpoint(self, checkpoint: Dict[str, Any]):
+        """
+        Write checkpoint atomically (temp file + rename)
+        """
+        if not self.checkpoint_path:
+            return
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def reset_checkpoint(self):
+        """
+        Forget progress so the next run starts from the first row
+        """
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def progress(self) -> Dict[str, Any]:
+        """
+        Snapshot of the current (or last) run
+        """
+        with self._lock:
+            return dict(self._progress)
+
+    def stop(self):
+        """
+        Ask a running job to stop after the current batch
+        """
+        self._stop.set()
+
+    def _set_progress(self, **values):
+        with self._lock:
+            self._progress.update(values)
+
+    def count_remaining(self, after_id: Optional[str]) -> Optional[int]:
+        """
+        Rows still to scan after the checkpoint
+        """
+        try:
+            query = supabase.table("messages_needing_translation").select("id", count="exact").limit(1)
+            if after_id:
+                query = query.gt("id", after_id)
+            return query.execute().count
+        except Exception as e:
+            logger.warning(f"Could not count backfill rows: {e}")
+            return None
+
+    def _fetch_batch(self, after_id: Optional[str]) -> List[Dict[str, Any]]:
+        query = (
+            supabase
+            .table("messages_needing_translation")
+            .select(_COLUMNS)
+            .order("id")
+            .limit(self.batch_size)
+        )
+        if after_id:
+            query = query.gt("id", after_id)
+        return query.execute().data or []
+
+    def _detect(self, executor: ProcessPoolExecutor, texts: List[str]) -> List[str]:
+        if not texts:
+            return []
+        chunk_size = max(1, -(-len(texts) // self.detect_workers))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        languages: List[str] = []
+        for chunk_result in executor.map(_detect_languages, chunks):
+            languages.extend(chunk_result)
+        return languages
+
+    def _process_batch(self, executor: ProcessPoolExecutor,
+                       rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Detect and translate a batch
+
+        Returns:
+            (rows to upsert, rows still unknown)
+        """
+        # Re-detect only rows whose language is unknown
+        undetected = [row for row in rows if (row.get('original_language') or 'unknown') == 'unknown']
+        detected = self._detect(executor, [row.get('original_content') or "" for row in undetected])
+        languages = {row['id']: language for row, language in zip(undetected, detected)}
+
+        # Group by language so each language is one batched provider call
+        by_language: Dict[str, List[Dict[str, Any]]] = {}
+        unknown = 0
+        for row in rows:
+            language = languages.get(row['id'], row.get('original_language') or 'unknown')
+            if language == 'unknown':
+                unknown += 1
+                continue
+            by_language.setdefault(language, []).append(row)
+
+        translator = get_translation_service()
+        updates: List[Dict[str, Any]] = []
+        for language, group in by_language.items():
+            originals = [row.get('original_content') or "" for row in group]
+            if language == 'tr':
+                translated = originals
+            else:
+                translated = translator.translate_many(originals, source_language=language, target_language='tr')
+
+            for row, original, text in zip(group, originals, translated):
+                changed_language = language != row.get('original_language')
+                status = 'done' if row.get('translation_status') else None
+                if language != 'tr' and (not text or text == original):
+                    # Translation still failing; keep a newly detected language though
+                    if not changed_language:
+                        continue
+                    text = row.get('translated_content') or original
+                    status = row.get('translation_status')
+                updates.append({
+                    'id': row['id'],
+                    'conversation_id': row['conversation_id'],
+                    'sender': row['sender'],
+                    'original_content': original,
+                    'original_language': language,
+                    'content': text,
+                    'translated_content': text,
+                    'translation_status': status,
+                })
+        return updates, unknown
+
+    def _write(self, updates: List[Dict[str, Any]]):
+        if not updates or self.dry_run:
+            return
+        # One request per batch; ON CONFLICT (id) DO UPDATE does not fire the insert trigger
+        (
+            supabase
+            .table("messages")
+            .upsert(updates, on_conflict="id", returning="minimal")
+            .execute()
+        )
+
+    def run(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run the backfill until no rows are left, `limit` rows were scanned or stop() is called
+
+        Args:
+            limit: Max rows to scan in this run (None for all)
+
+        Returns:
+            Final progress dict
+        """
+        self._stop.clear()
+        checkpoint = self.load_checkpoint()
+        after_id = checkpoint.get('last_id')
+        totals = {
+            'scanned': checkpoint.get('scanned', 0),
+            'updated': checkpoint.get('updated', 0),
+            'unknown': checkpoint.get('unknown', 0),
+        }
+        remaining = self.count_remaining(after_id)
+        started = time.monotonic()
+        scanned_this_run = 0
+
+        self._set_progress(
+            state="running",
+            started_at=datetime.now(timezone.utc).isoformat(),
+            remaining_at_start=remaining,
+            last_id=after_id,
+            dry_run=self.dry_run,
+            error=None,
+            **totals
+        )
+        logger.info(f"Translation backfill started after id={after_id}, ~{remaining} rows to scan")
+
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=self.detect_workers, mp_context=context,
+                                     initializer=_init_detect_worker) as executor:
+                while not self._stop.is_set():
+                    if limit is not None and scanned_this_run >= limit:
+                        break
+                    rows = self._fetch_batch(after_id)
+                    if limit is not None:
+                        rows = rows[:limit - scanned_this_run]
+                    if not rows:
+                        break
+
+                    updates, unknown = self._process_batch(executor, rows)
+                    self._write(updates)
+
+                    after_id = rows[-1]['id']
+                    scanned_this_run += len(rows)
+                    totals['scanned'] += len(rows)
+                    totals['updated'] += len(updates)
+                    totals['unknown'] += unknown
+                    if not self.dry_run:
+                        self.save_checkpoint({
+                            'last_id': after_id,
+                            'updated_at': datetime.now(timezone.utc).isoformat(),
+                            **totals
+                        })
+
+                    elapsed = time.monotonic() - started
+                    throughput = scanned_this_run / elapsed if elapsed > 0 else 0.0
+                    self._set_progress(
+                        last_id=after_id,
+                        messages_per_second=round(throughput, 2),
+                        **totals
+                    )
+                    logger.info(
+                        f"Translation backfill: scanned {scanned_this_run}"
+                        f"{f'/{remaining}' if remaining is not None else ''}, "
+                        f"updated {totals['updated']}, unknown {totals['unknown']}, "
+                        f"{throughput:.1f} msg/s"
+                    )
+
+                    # Throughput cap: sleep until we are back on the target rate
+                    if self.rate > 0:
+                        ahead = scanned_this_run / self.rate - (time.monotonic() - started)
+                        if ahead > 0:
+                            self._stop.wait(ahead)
+
+            state = "stopped" if self._stop.is_set() else "done"
+        except Exception as e:
+            logger.error(f"Translation backfill failed: {e}", exc_info=True)
+            state = "failed"
+            self._set_progress(error=str(e))
+
+        self._set_progress(state=state, finished_at=datetime.now(timezone.utc).isoformat())
+        logger.info(f"Translation backfill {state}: {totals}")
+        return self.progress()
+
+    def start(self, limit: Optional[int] = None) -> bool:
+        """
+        Run in a background thread (for the admin endpoint)
+
+        Returns:
+            False if a run is already in progress
+        """
+        if self.progress().get('state') == "running":
+            return False
+        self._set_progress(state="running")
+        threading.Thread(target=self.run, kwargs={'limit': limit}, daemon=True).start()
+        return True
+
+
+# Singleton instance
+_translation_backfill = None
+
+
+def get_translation_backfill() -> TranslationBackfill:
+    """Get singleton instance of TranslationBackfill"""
+    global _translation_backfill
+    if _translation_backfill is None:
+        _translation_backfill = TranslationBackfill()
+    return _translation_backfill
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-detect and re-translate historical messages")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max messages per second (0 = no cap)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_DETECT_WORKERS, help="Detection processes")
+    parser.add_argument("--limit", type=int, default=None, help="Max rows to scan in this run")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH)
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and start over")
+    parser.add_argument("--dry-run", action="store_true", help="Do not write messages")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+    )
+
+    job = TranslationBackfill(
+        batch_size=args.batch_size,
+        rate=args.rate,
+        detect_workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        dry_run=args.dry_run,
+    )
+    if args.reset:
+        job.reset_checkpoint()
+    result = job.run(limit=args.limit)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Translation Cache
+Translation memory for TranslationService
+In-process LRU in front of a durable SQLite store, with TTL and size-based eviction
+Never raises exceptions - a cache failure behaves like a miss
+"""
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment)
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "translation_cache.sqlite3",
+)
+DEFAULT_MEMORY_SIZE = 5000
+DEFAULT_DISK_SIZE = 200000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+_WHITESPACE_RE = re.compile(r"[ \t\r\f\v]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache keying
+    Unicode NFC, trimmed, runs of spaces/tabs collapsed (line breaks are kept)
+    """
+    text = unicodedata.normalize("NFC", text)
+    lines = [_WHITESPACE_RE.sub(" ", line).strip() for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+
+def make_cache_key(text: str, source: str, target: str) -> str:
+    """
+    Build translation memory key from (source, target, normalized text hash)
+    """
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{source or 'auto'}:{target}:{digest}"
+
+
+class TranslationCache:
+    """
+    Two-level translation memory
+    - L1: in-process LRU (OrderedDict), microsecond lookups
+    - L2: local SQLite file, survives restarts and is shared between workers
+    Entries expire after ttl_seconds; both levels are bounded by entry count
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH,
+                 memory_size: int = DEFAULT_MEMORY_SIZE,
+                 disk_size: int = DEFAULT_DISK_SIZE,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        """
+        Initialize translation cache
+
+        Args:
+            path: SQLite file path (None disables the durable store)
+            memory_size: Maximum number of entries kept in memory
+            disk_size: Maximum number of entries kept in SQLite
+            ttl_seconds: Entry lifetime in seconds
+        """
+        self.path = path
+        self.memory_size = max(1, memory_size)
+        self.disk_size = max(1, disk_size)
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            self._init_disk()
+
+    def _init_disk(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_accessed_at"
+                " ON translations(accessed_at)"
+            )
+            conn.commit()
+            logger.info(f"Translation cache store ready at {self.path}")
+        except Exception as e:
+            logger.error(f"Translation cache store unavailable ({e}), using memory only")
+            self.path = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, text: str, source: str, target: str) -> Optional[str]:
+        """
+        Look up a cached translation
+
+        Returns:
+            Cached translation or None on miss
+        """
+        key = make_cache_key(text, source, target)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_set(key, value[0], value[1])
+        return value[0]
+
+    def set(self, text: str, source: str, target: str, translated_text: str):
+        """
+        Store a translation in both cache levels
+        """
+        key = make_cache_key(text, source, target)
+        now = time.time()
+        with self._lock:
+            self._memory_set(key, translated_text, now)
+        self._disk_set(key, translated_text, now)
+
+    def _memory_set(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        if not self.path:
+            return None
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._is_expired(row[1], now):
+                conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE translations SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return row[0], row[1]
+        except Exception as e:
+            logger.warning(f"Translation cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: str, now: float):
+        if not self.path:
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO translations (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            conn.commit()
+            self._disk_writes += 1
+            # Evict periodically rather than on every write
+            if self._disk_writes % 500 == 0:
+                self._disk_evict(now)
+        except Exception as e:
+            logger.warning(f"Translation cache write failed: {e}")
+
+    def _disk_evict(self, now: float):
+        conn = self._connection()
+        if self.ttl_seconds > 0:
+            conn.execute(
+                "DELETE FROM translations WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        conn.execute(
+            "DELETE FROM translations WHERE key IN ("
+            " SELECT key FROM translations ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_size,),
+        )
+        conn.commit()
+
+    def clear(self):
+        """
+        Drop all cached translations
+        """
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            try:
+                conn = self._connection()
+                conn.execute("DELETE FROM translations")
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"Translation cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss counters
+
+        Returns:
+            Dict with memory_hits, disk_hits, misses, hit_rate and memory_entries
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+def create_translation_cache() -> Optional[TranslationCache]:
+    """
+    Build translation cache from environment
+    TRANSLATION_CACHE_ENABLED=false disables caching entirely
+    """
+    if os.getenv("TRANSLATION_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    path = os.getenv("TRANSLATION_CACHE_PATH", DEFAULT_CACHE_PATH) or None
+    return TranslationCache(
+        path=path,
+        memory_size=int(os.getenv("TRANSLATION_CACHE_MEMORY_SIZE", str(DEFAULT_MEMORY_SIZE))),
+        disk_size=int(os.getenv("TRANSLATION_CACHE_DISK_SIZE", str(DEFAULT_DISK_SIZE))),
+        ttl_seconds=int(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", str(DEFAULT_TTL_SECONDS))),
+    )
@@ -0,0 +1,130 @@
+"""
+Translation Masking
+Replaces numbers, SKUs, product codes, emails, phone numbers and URLs with
+stable placeholders before translation, and restores them afterwards
+- "I need 500 bags of X-200" and "I need 300 bags of X-200" share one cache entry
+- product codes and contact details are never mangled by the translator
+"""
+from typing import Callable, List, Optional, Tuple
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# SKU list is reloaded from products.sku at most this often (seconds)
+DEFAULT_SKU_REFRESH_SECONDS = 600
+
+# Placeholder format; restore tolerates spaces the translator may insert
+PLACEHOLDER = "[[{}]]"
+_PLACEHOLDER_RE = re.compile(r"\[\[\s*(\d+)\s*\]\]")
+
+# Order matters: earlier alternatives win when they overlap
+_STATIC_PATTERNS = [
+    r"(?:https?://|www\.)[^\s<>\"']+[^\s<>\"'.,;:!?)]",  # URLs
+    r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",  # emails
+    r"\+?\d[\d ()./-]{7,}\d",  # phone numbers
+]
+_CODE_PATTERNS = [
+    r"\b[A-Za-z]{1,6}-?\d[\w-]*\b",  # product codes like X-200, AB123
+    r"\d+(?:[.,]\d+)*",  # numbers and quantities
+]
+
+
+def load_product_skus() -> List[str]:
+    """
+    Load SKUs from products.sku
+
+    Returns:
+        List of non-empty SKUs (empty list on failure)
+    """
+    try:
+        from services.supabase_client import supabase
+
+        response = supabase.table("products").select("sku").not_.is_("sku", "null").execute()
+        return [row['sku'].strip() for row in (response.data or []) if (row.get('sku') or "").strip()]
+    except Exception as e:
+        logger.warning(f"Could not load product SKUs for translation masking: {e}")
+        return []
+
+
+class PlaceholderMasker:
+    """
+    Masks untranslatable tokens with indexed placeholders
+    """
+
+    def __init__(self, sku_loader: Optional[Callable[[], List[str]]] = load_product_skus,
+                 sku_refresh_seconds: float = DEFAULT_SKU_REFRESH_SECONDS):
+        """
+        Initialize masker
+
+        Args:
+            sku_loader: Callable returning known SKUs (None disables SKU masking)
+            sku_refresh_seconds: How often to reload SKUs
+        """
+        self.sku_loader = sku_loader
+        self.sku_refresh_seconds = sku_refresh_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._pattern = self._compile([])
+
+    def _compile(self, skus: List[str]) -> "re.Pattern":
+        parts = list(_STATIC_PATTERNS)
+        if skus:
+            # Longest first so "AB-100X" wins over "AB-100"
+            escaped = sorted({re.escape(sku) for sku in skus}, key=len, reverse=True)
+            parts.append(r"(?<!\w)(?:" + "|".join(escaped) + r")(?!\w)")
+        parts.extend(_CODE_PATTERNS)
+        return re.compile("|".join(f"(?:{part})" for part in parts))
+
+    def _get_pattern(self) -> "re.Pattern":
+        if self.sku_loader is None:
+            return self._pattern
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.sku_refresh_seconds:
+            return self._pattern
+        with self._lock:
+            if self._loaded_at is None or now - self._loaded_at >= self.sku_refresh_seconds:
+                self._loaded_at = now
+                self._pattern = self._compile(self.sku_loader())
+        return self._pattern
+
+    def mask(self, text: str) -> Tuple[str, List[str]]:
+        """
+        Replace maskable tokens with placeholders
+
+        Returns:
+            (template, values) - values[i] is the original token for placeholder i
+        """
+        values: List[str] = []
+
+        def replace(match: "re.Match") -> str:
+            values.append(match.group(0))
+            return PLACEHOLDER.format(len(values) - 1)
+
+        # Literal placeholders in the input would be ambiguous; leave such text alone
+        if _PLACEHOLDER_RE.search(text):
+            return text, []
+        template = self._get_pattern().sub(replace, text)
+        return template, values
+
+    @staticmethod
+    def unmask(template: str, values: List[str]) -> Optional[str]:
+        """
+        Restore placeholders in a translated template
+
+        Returns:
+            Restored text, or None if placeholders were lost or duplicated by the translator
+        """
+        found = [int(index) for index in _PLACEHOLDER_RE.findall(template)]
+        if sorted(found) != list(range(len(values))):
+            return None
+        return _PLACEHOLDER_RE.sub(lambda match: values[int(match.group(1))], template)
+
+    @staticmethod
+    def has_translatable_text(template: str) -> bool:
+        """
+        Check whether anything but placeholders, digits and punctuation is left
+        """
+        return any(c.isalpha() for c in _PLACEHOLDER_RE.sub("", template))
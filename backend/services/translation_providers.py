@@ -0,0 +1,206 @@
+"""
+Translation Providers
+Pluggable translation backends and a circuit breaker for TranslationService
+Providers raise on failure; TranslationService turns failures into fallbacks
+"""
+from typing import Optional, Dict, Any
+from deep_translator import GoogleTranslator, MyMemoryTranslator
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationProvider:
+    """
+    Base class for translation backends
+    """
+    name = "base"
+
+    def translate(self, text: str, source: str, target: str) -> Optional[str]:
+        """
+        Translate text
+
+        Args:
+            text: Text to translate
+            source: Source language code or 'auto'
+            target: Target language code
+
+        Returns:
+            Translated text (may be None/empty if the backend returned nothing)
+
+        Raises:
+            Exception: Any backend error
+        """
+        raise NotImplementedError
+
+
+class GoogleTranslationProvider(TranslationProvider):
+    """
+    Google Translate via deep-translator
+    """
+    name = "google"
+
+    def translate(self, text: str, source: str, target: str) -> Optional[str]:
+        return GoogleTranslator(source=source, target=target).translate(text)
+
+
+class MyMemoryTranslationProvider(TranslationProvider):
+    """
+    MyMemory via deep-translator (no API key, lower quota than Google)
+    MyMemory needs region codes (en-GB, de-DE); ISO 639-1 codes are mapped
+    """
+    name = "mymemory"
+
+    def __init__(self):
+        from deep_translator.constants import MY_MEMORY_LANGUAGES_TO_CODES
+        self._codes: Dict[str, str] = {}
+        for code in MY_MEMORY_LANGUAGES_TO_CODES.values():
+            self._codes.setdefault(code.split("-")[0].lower(), code)
+
+    def _to_code(self, language: str) -> str:
+        code = self._codes.get(language.lower().split("-")[0])
+        if not code:
+            raise ValueError(f"Language not supported by MyMemory: {language}")
+        return code
+
+    def translate(self, text: str, source: str, target: str) -> Optional[str]:
+        if source == "auto":
+            raise ValueError("MyMemory does not support source language auto-detection")
+        return MyMemoryTranslator(
+            source=self._to_code(source),
+            target=self._to_code(target)
+        ).translate(text)
+
+
+class StubTranslationProvider(TranslationProvider):
+    """
+    Offline provider for tests and local development
+    Returns the text prefixed with the target language, e.g. "[tr] Hello"
+    """
+    name = "stub"
+
+    def translate(self, text: str, source: str, target: str) -> Optional[str]:
+        return f"[{target}] {text}"
+
+
+PROVIDERS = {
+    "google": GoogleTranslationProvider,
+    "mymemory": MyMemoryTranslationProvider,
+    "stub": StubTranslationProvider,
+}
+
+
+def create_provider(name: Optional[str]) -> Optional[TranslationProvider]:
+    """
+    Build a provider by name
+
+    Returns:
+        Provider instance, or None if the name is empty or unknown
+    """
+    if not name:
+        return None
+    provider_class = PROVIDERS.get(name.lower())
+    if provider_class is None:
+        logger.warning(f"Unsupported translation provider: {name}")
+        return None
+    return provider_class()
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a translation provider
+
+    - closed: calls go through; consecutive failures are counted
+    - open: after failure_threshold failures (errors or calls slower than
+      slow_call_seconds), calls are skipped for cooldown_seconds
+    - half_open: after the cool-down one probe call is let through;
+      success closes the breaker, failure opens it again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0,
+                 slow_call_seconds: Optional[float] = None):
+        """
+        Initialize circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures before opening
+            cooldown_seconds: How long to skip the provider once open
+            slow_call_seconds: Successful calls slower than this count as failures (optional)
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.slow_call_seconds = slow_call_seconds
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.total_failures = 0
+        self.total_rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go to the provider now
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self, duration: float = 0.0):
+        """
+        Record a completed call (slow calls count as failures)
+        """
+        if self.slow_call_seconds is not None and duration > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """
+        Record a failed or timed-out call
+        """
+        with self._lock:
+            self._failures += 1
+            self.total_failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Translation circuit breaker opened for {self.cooldown_seconds}s after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Breaker state and counters
+        """
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "total_failures": self.total_failures,
+                "total_rejected": self.total_rejected,
+            }
@@ -0,0 +1,187 @@
+"""
+Translation Scheduler
+Priority-aware admission control for translation provider calls
+Token buckets on characters/second and requests/second keep us under the
+provider quota; interactive calls are always served before bulk work
+"""
+from typing import Optional, Dict, Any, List, Tuple
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Priority classes (lower value is served first)
+INTERACTIVE = 0
+BULK = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Defaults (overridable via environment)
+DEFAULT_CHARS_PER_SECOND = 20000.0
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_BURST_SECONDS = 2.0
+DEFAULT_BULK_RESERVE = 0.25
+# Bulk calls give up after this long instead of hanging on a misconfigured quota
+DEFAULT_BULK_MAX_WAIT_SECONDS = 300.0
+
+
+class TokenBucket:
+    """
+    Classic token bucket; rate <= 0 means unlimited
+    Not thread-safe on its own - TranslationScheduler holds the lock
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize token bucket
+
+        Args:
+            rate: Tokens added per second
+            capacity: Max tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0) -> float:
+        """
+        Seconds until `amount` tokens are available while keeping `reserve` tokens untouched
+        Requests larger than the usable part of the bucket wait for a full bucket,
+        so `needed` never exceeds capacity and every request is admitted eventually
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        reserve = min(reserve, self.capacity)
+        needed = min(amount, self.capacity - reserve) + reserve
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+
+
+class TranslationScheduler:
+    """
+    Admits provider calls in priority order under a character and request budget
+
+    Waiters form one priority queue; only its head may take tokens, so a bulk
+    call never overtakes a waiting interactive one. Bulk calls additionally
+    leave a reserve in the buckets so interactive bursts are served at once.
+    """
+
+    def __init__(self, chars_per_second: float = DEFAULT_CHARS_PER_SECOND,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 burst_seconds: float = DEFAULT_BURST_SECONDS,
+                 bulk_reserve: float = DEFAULT_BULK_RESERVE):
+        """
+        Initialize scheduler
+
+        Args:
+            chars_per_second: Provider character quota (<= 0 for unlimited)
+            requests_per_second: Provider request quota (<= 0 for unlimited)
+            burst_seconds: Bucket capacity in seconds of quota
+            bulk_reserve: Fraction of each bucket bulk calls may not use
+        """
+        self.chars = TokenBucket(chars_per_second, chars_per_second * burst_seconds)
+        self.requests = TokenBucket(requests_per_second, requests_per_second * burst_seconds)
+        self.bulk_reserve = min(max(bulk_reserve, 0.0), 0.9)
+
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+        self._admitted = {INTERACTIVE: 0, BULK: 0}
+        self._rejected = {INTERACTIVE: 0, BULK: 0}
+        self._wait_total = {INTERACTIVE: 0.0, BULK: 0.0}
+        self._wait_max = {INTERACTIVE: 0.0, BULK: 0.0}
+
+    def _wait_time(self, chars: int, priority: int) -> float:
+        reserve = self.bulk_reserve if priority != INTERACTIVE else 0.0
+        return max(
+            self.chars.wait_time(chars, self.chars.capacity * reserve),
+            self.requests.wait_time(1, self.requests.capacity * reserve),
+        )
+
+    def acquire(self, chars: int, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a provider call of `chars` characters may start
+
+        Args:
+            chars: Characters the call will send
+            priority: INTERACTIVE or BULK
+            timeout: Max seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if admitted, False if the timeout expired first
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        ticket = (priority, next(self._sequence))
+
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._queue[0] == ticket:
+                        wait = self._wait_time(chars, priority)
+                        if wait <= 0:
+                            self.chars.consume(chars)
+                            self.requests.consume(1)
+                            heapq.heappop(self._queue)
+                            self._record_admit(priority, time.monotonic() - started)
+                            return True
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._queue.remove(ticket)
+                        heapq.heapify(self._queue)
+                        self._rejected[priority] = self._rejected.get(priority, 0) + 1
+                        return False
+
+                    # Head waits for tokens; others wait to become head
+                    candidates = [value for value in (wait, remaining) if value is not None]
+                    self._cond.wait(timeout=min(candidates) if candidates else None)
+            finally:
+                self._cond.notify_all()
+
+    def _record_admit(self, priority: int, waited: float):
+        self._admitted[priority] = self._admitted.get(priority, 0) + 1
+        self._wait_total[priority] = self._wait_total.get(priority, 0.0) + waited
+        self._wait_max[priority] = max(self._wait_max.get(priority, 0.0), waited)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth and wait times per priority class
+        """
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._queue:
+                depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+
+            result: Dict[str, Any] = {"queue_depth": depth}
+            for priority, name in PRIORITY_NAMES.items():
+                admitted = self._admitted.get(priority, 0)
+                result[name] = {
+                    "admitted": admitted,
+                    "timed_out": self._rejected.get(priority, 0),
+                    "avg_wait_ms": round(self._wait_total.get(priority, 0.0) / admitted * 1000, 2) if admitted else 0.0,
+                    "max_wait_ms": round(self._wait_max.get(priority, 0.0) * 1000, 2),
+                }
+            return result
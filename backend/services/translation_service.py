@@ -1,33 +1,447 @@
 """
 Translation Service
 Production-safe translation service using deep-translator
-Uses Google Translate via deep-translator library
+Uses Google Translate via deep-translator library (pluggable providers with circuit breakers)
+Numbers, SKUs, emails, phones and URLs are masked as placeholders before translation
+Translations are served from a translation memory cache when possible
 Never raises exceptions - always returns original text on failure
 """
-from typing import Optional
-from deep_translator import GoogleTranslator
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, List, Tuple
+from services.translation_cache import TranslationCache, create_translation_cache, make_cache_key
+from services.translation_masking import PlaceholderMasker
+from services.translation_scheduler import (
+    BULK,
+    INTERACTIVE,
+    DEFAULT_BULK_MAX_WAIT_SECONDS,
+    DEFAULT_CHARS_PER_SECOND,
+    DEFAULT_REQUESTS_PER_SECOND,
+    TranslationScheduler,
+)
+from services.translation_providers import CircuitBreaker, TranslationProvider, create_provider
+import asyncio
+import functools
 import logging
+import os
+import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Google Translate rejects requests above 5000 characters; keep a safety margin
+PROVIDER_CHAR_LIMIT = 4500
+
+# Separator used to pack several texts into one provider request
+BATCH_SEPARATOR = "\n@@@\n"
+_BATCH_SPLIT_RE = re.compile(r"\s*@@@\s*")
+
+# Async path: max provider calls in flight and per-call timeout (seconds)
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+# Provider calls slower than this are abandoned and count as breaker failures
+DEFAULT_LATENCY_BUDGET_SECONDS = 5.0
+
+# Circuit breaker: consecutive failures before skipping a provider, and for how long
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_COOLDOWN_SECONDS = 30.0
+
+# Long texts: max segments of one message translated in parallel
+DEFAULT_SEGMENT_WORKERS = 4
+
+# Split boundaries for long texts, coarsest first: paragraphs, lines, sentences, words
+_SEGMENT_SPLIT_LEVELS = [
+    re.compile(r"(\n[ \t]*\n\s*)"),
+    re.compile(r"(\n)"),
+    re.compile(r"((?<=[.!?;:\u3002\uff01\uff1f])\s+)"),
+    re.compile(r"(\s+)"),
+]
+
+
+def split_into_segments(text: str, limit: int = PROVIDER_CHAR_LIMIT, level: int = 0) -> List[str]:
+    """
+    Split text into segments of at most `limit` characters
+    
+    Prefers paragraph boundaries, then line, sentence and word boundaries,
+    and only cuts inside a word as a last resort. Separators stay attached to
+    the segments, so ''.join(segments) == text.
+    
+    Args:
+        text: Text to split
+        limit: Max segment length in characters
+        
+    Returns:
+        List of segments in order
+    """
+    if len(text) <= limit:
+        return [text]
+    
+    if level >= len(_SEGMENT_SPLIT_LEVELS):
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+    
+    # re.split with a capturing group alternates text and separator
+    parts = _SEGMENT_SPLIT_LEVELS[level].split(text)
+    units = [
+        parts[i] + (parts[i + 1] if i + 1 < len(parts) else "")
+        for i in range(0, len(parts), 2)
+    ]
+    
+    segments: List[str] = []
+    current = ""
+    for unit in units:
+        if len(unit) > limit:
+            if current:
+                segments.append(current)
+                current = ""
+            segments.extend(split_into_segments(unit, limit, level + 1))
+        elif len(current) + len(unit) > limit:
+            segments.append(current)
+            current = unit
+        else:
+            current += unit
+    if current:
+        segments.append(current)
+    return segments
+
 class TranslationService:
     """
     Production-safe service for translating text between languages
-    Uses deep-translator.GoogleTranslator for Google Translate API
+    Uses a primary provider (Google by default) and an optional secondary one,
+    each behind a circuit breaker with a per-call latency budget
     Never raises exceptions - returns original text on any failure
     """
     
-    def __init__(self, provider: str = "google"):
+    def __init__(self, provider: str = "google", cache: Optional[TranslationCache] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 segment_workers: int = DEFAULT_SEGMENT_WORKERS,
+                 fallback_provider: Optional[str] = None,
+                 latency_budget: float = DEFAULT_LATENCY_BUDGET_SECONDS,
+                 breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+                 breaker_cooldown: float = DEFAULT_BREAKER_COOLDOWN_SECONDS,
+                 masker: Optional[PlaceholderMasker] = None,
+                 scheduler: Optional[TranslationScheduler] = None,
+                 bulk_max_wait: float = DEFAULT_BULK_MAX_WAIT_SECONDS):
         """
         Initialize translation service
         
         Args:
-            provider: Translation provider (currently only 'google' supported)
+            provider: Primary translation provider ('google', 'mymemory' or 'stub')
+            cache: Translation memory (optional, no caching if None)
+            max_concurrency: Max translations running at once on the async path
+            timeout: Per-call timeout in seconds on the async path
+            segment_workers: Max segments of a long text translated in parallel
+            fallback_provider: Secondary provider used when the primary fails or its breaker is open
+            latency_budget: Max seconds to wait for one provider call
+            breaker_failures: Consecutive failures/slow calls before a provider is skipped
+            breaker_cooldown: Seconds a provider is skipped once its breaker opens
+            masker: Placeholder masker applied before translation (optional)
+            scheduler: Priority scheduler / quota limiter for provider calls (optional)
+            bulk_max_wait: Max seconds a bulk call waits for the scheduler
         """
-        self.provider = provider
-        if provider != "google":
+        primary = create_provider(provider)
+        if primary is None:
             logger.warning(f"Unsupported translation provider: {provider}, using 'google'")
-            self.provider = "google"
+            primary = create_provider("google")
+        self.provider = primary.name
+        self.latency_budget = latency_budget
+        
+        self._providers: List[Tuple[TranslationProvider, CircuitBreaker]] = [
+            (primary, CircuitBreaker(breaker_failures, breaker_cooldown, latency_budget))
+        ]
+        secondary = create_provider(fallback_provider)
+        if secondary is not None and secondary.name != primary.name:
+            self._providers.append(
+                (secondary, CircuitBreaker(breaker_failures, breaker_cooldown, latency_budget))
+            )
+        
+        self.cache = cache
+        self.masker = masker
+        self.scheduler = scheduler
+        self.bulk_max_wait = bulk_max_wait
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        
+        # Dedicated pool so blocking provider calls never run on the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="translation"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        
+        # Provider calls run here so a hung request can be abandoned after the latency budget
+        self._provider_executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency * 2,
+            thread_name_prefix="translation-provider"
+        )
+        
+        # Single-flight: concurrent misses for the same key share one provider call
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.coalesced_calls = 0
+        
+        # Separate pool for segments: callers may already run on self._executor
+        self._segment_executor = ThreadPoolExecutor(
+            max_workers=max(1, segment_workers),
+            thread_name_prefix="translation-segment"
+        )
+    
+    def _translate_text(self, text: str, source: str, target: str,
+                        priority: int = INTERACTIVE) -> Optional[str]:
+        """
+        Translate with placeholder masking
+        
+        Maskable tokens are replaced by placeholders, the masked template is
+        translated (and cached), then the original tokens are put back. If the
+        provider loses a placeholder, the unmasked text is translated instead.
+        
+        Args:
+            text: Text to translate (already validated)
+            source: Source language code or 'auto'
+            target: Target language code
+            priority: Scheduler priority (INTERACTIVE or BULK)
+            
+        Returns:
+            Translated text, or None if the provider failed or returned nothing
+        """
+        if not self.masker:
+            return self._translate_cached(text, source, target, priority)
+        
+        template, values = self.masker.mask(text)
+        if not values:
+            return self._translate_cached(text, source, target, priority)
+        if not self.masker.has_translatable_text(template):
+            return text
+        
+        translated_template = self._translate_cached(template, source, target, priority)
+        if translated_template is None:
+            return None
+        
+        restored = self.masker.unmask(translated_template, values)
+        if restored is None:
+            logger.warning("Translator altered placeholders, translating unmasked text")
+            return self._translate_cached(text, source, target, priority)
+        return restored
+    
+    def _translate_cached(self, text: str, source: str, target: str,
+                          priority: int = INTERACTIVE) -> Optional[str]:
+        """
+        Translate through the translation memory, calling the provider on a miss
+        
+        Concurrent misses for the same (source, target, text) are coalesced:
+        the first caller runs the provider call, the others wait for its result.
+        
+        Args:
+            text: Text to translate (already validated)
+            source: Source language code or 'auto'
+            target: Target language code
+            
+        Returns:
+            Translated text, or None if the provider failed or returned nothing
+        """
+        if self.cache:
+            cached = self.cache.get(text, source, target)
+            if cached is not None:
+                return cached
+        
+        key = make_cache_key(text, source, target)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced_calls += 1
+        
+        if not is_leader:
+            return future.result(timeout=self.timeout)
+        
+        try:
+            translated_text = self._translate_uncached(text, source, target, priority)
+            if translated_text and self.cache:
+                self.cache.set(text, source, target, translated_text)
+            future.set_result(translated_text)
+            return translated_text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def _translate_uncached(self, text: str, source: str, target: str,
+                            priority: int = INTERACTIVE) -> Optional[str]:
+        """
+        Translate without consulting the cache for the full text
+        Texts above the provider limit are segmented
+        """
+        if len(text) > PROVIDER_CHAR_LIMIT:
+            return self._translate_segmented(text, source, target, priority)
+        return self._call_provider(text, source, target, priority)
+    
+    def _translate_segmented(self, text: str, source: str, target: str,
+                             priority: int = INTERACTIVE) -> Optional[str]:
+        """
+        Translate a long text segment by segment, in parallel
+        
+        Surrounding whitespace of every segment (paragraph breaks, line breaks)
+        is kept as-is. Segments that fail keep their original text.
+        
+        Returns:
+            Reassembled translation, or None if no segment could be translated
+        """
+        segments = split_into_segments(text)
+        
+        def translate_segment(segment: str) -> Optional[str]:
+            core = segment.strip()
+            if not core:
+                return segment
+            leading = segment[:len(segment) - len(segment.lstrip())]
+            trailing = segment[len(segment.rstrip()):]
+            try:
+                translated = self._translate_cached(core, source, target, priority)
+            except Exception as e:
+                logger.error(f"Error translating segment from {source} to {target}: {e}")
+                translated = None
+            return f"{leading}{translated}{trailing}" if translated else None
+        
+        results = list(self._segment_executor.map(translate_segment, segments))
+        
+        failed = sum(1 for result in results if result is None)
+        if failed == len(segments):
+            return None
+        if failed:
+            logger.warning(f"{failed}/{len(segments)} segments failed, keeping their original text")
+        
+        logger.info(f"Translated long text in {len(segments)} segments ({len(text)} chars)")
+        return "".join(
+            result if result is not None else segment
+            for segment, result in zip(segments, results)
+        )
+    
+    def _call_provider(self, text: str, source: str, target: str,
+                       priority: int = INTERACTIVE) -> Optional[str]:
+        """
+        Single provider request, bypassing the cache
+        
+        Waits for the scheduler to admit the call (interactive calls first),
+        then tries each provider in order, skipping those whose circuit breaker
+        is open. Calls exceeding the latency budget are abandoned and count as failures.
+        
+        Returns:
+            Translated text, or None if every provider failed, was skipped or returned nothing
+        """
+        if self.scheduler:
+            # Interactive calls give up after the call timeout; bulk work waits its turn,
+            # but not forever (a bulk call stuck this long points at a misconfigured quota)
+            timeout = self.timeout if priority == INTERACTIVE else self.bulk_max_wait
+            if not self.scheduler.acquire(len(text), priority, timeout=timeout):
+                if priority == INTERACTIVE:
+                    logger.warning(f"Translation quota wait exceeded {timeout}s, returning no translation")
+                else:
+                    logger.error(f"Bulk translation of {len(text)} chars not admitted within {timeout}s, check TRANSLATION_RATE_* settings")
+                return None
+        
+        for provider, breaker in self._providers:
+            if not breaker.allow_request():
+                continue
+            
+            started = time.monotonic()
+            try:
+                future = self._provider_executor.submit(provider.translate, text, source, target)
+                translated_text = future.result(timeout=self.latency_budget)
+            except FutureTimeoutError:
+                breaker.record_failure()
+                logger.warning(f"Translation provider {provider.name} exceeded latency budget of {self.latency_budget}s")
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                logger.warning(f"Translation provider {provider.name} failed ({source} -> {target}): {e}")
+                continue
+            
+            breaker.record_success(time.monotonic() - started)
+            if translated_text and isinstance(translated_text, str) and translated_text.strip():
+                return translated_text
+            logger.warning(f"Translation provider {provider.name} returned empty result")
+        
+        return None
+    
+    def _build_batches(self, texts: List[str], indices: List[int]) -> List[List[int]]:
+        """
+        Group text indices into batches whose packed size stays under the provider limit
+        Texts that cannot be packed safely get a batch of their own
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_size = 0
+        
+        for index in indices:
+            text = texts[index]
+            size = len(text) + len(BATCH_SEPARATOR)
+            if "@@@" in text or size > PROVIDER_CHAR_LIMIT:
+                batches.append([index])
+                continue
+            if current and current_size + size > PROVIDER_CHAR_LIMIT:
+                batches.append(current)
+                current, current_size = [], 0
+            current.append(index)
+            current_size += size
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _translate_batch(self, texts: List[str], source: str, target: str,
+                         priority: int = BULK) -> List[Optional[str]]:
+        """
+        Translate several texts with one provider request
+        Falls back to one request per item if the packed response cannot be split back
+        
+        Returns:
+            Translations in input order (None for items that failed)
+        """
+        if len(texts) > 1:
+            try:
+                packed = self._call_provider(BATCH_SEPARATOR.join(texts), source, target, priority)
+                parts = _BATCH_SPLIT_RE.split(packed.strip()) if packed else []
+                if len(parts) == len(texts) and all(part.strip() for part in parts):
+                    return parts
+                logger.warning(f"Batch translation returned {len(parts)} parts for {len(texts)} texts, retrying per item")
+            except Exception as e:
+                logger.warning(f"Batch translation failed: {e}, retrying per item")
+        
+        results: List[Optional[str]] = []
+        for text in texts:
+            try:
+                results.append(self._translate_uncached(text, source, target, priority))
+            except Exception as e:
+                logger.error(f"Error translating batch item from {source} to {target}: {e}")
+                results.append(None)
+        return results
+    
+    def get_stats(self) -> Dict[str, object]:
+        """
+        Get translation counters
+        
+        Returns:
+            Dict with cache stats (empty if caching is disabled), coalesced call count,
+            scheduler queue depth/wait times and circuit breaker state per provider
+        """
+        with self._inflight_lock:
+            coalesced_calls = self.coalesced_calls
+            inflight = len(self._inflight)
+        return {
+            "cache": self.cache.stats() if self.cache else {},
+            "coalesced_calls": coalesced_calls,
+            "inflight_calls": inflight,
+            "scheduler": self.scheduler.stats() if self.scheduler else {},
+            "providers": [
+                {"name": provider.name, **breaker.stats()}
+                for provider, breaker in self._providers
+            ],
+        }
     
     def translate_to_turkish(self, text: str, source_language: Optional[str] = None) -> str:
         """
@@ -50,19 +464,11 @@ class TranslationService:
             return text
         
         try:
-            # Create translator instance
-            if source_language:
-                # Translate from specific language to Turkish
-                translator = GoogleTranslator(source=source_language, target='tr')
-            else:
-                # Auto-detect source language and translate to Turkish
-                translator = GoogleTranslator(source='auto', target='tr')
-            
-            # Perform translation
-            translated_text = translator.translate(text)
+            # Translate from specific language, or auto-detect source language
+            translated_text = self._translate_text(text, source_language or 'auto', 'tr')
             
             # Validate result
-            if translated_text and isinstance(translated_text, str) and translated_text.strip():
+            if translated_text:
                 logger.info(f"Successfully translated text to Turkish (source: {source_language or 'auto'})")
                 return translated_text
             else:
@@ -100,14 +506,11 @@ class TranslationService:
             return text
         
         try:
-            # Create translator instance
-            translator = GoogleTranslator(source='tr', target=target_language)
-            
             # Perform translation
-            translated_text = translator.translate(text)
+            translated_text = self._translate_text(text, 'tr', target_language)
             
             # Validate result
-            if translated_text and isinstance(translated_text, str) and translated_text.strip():
+            if translated_text:
                 logger.info(f"Successfully translated text from Turkish to {target_language}")
                 return translated_text
             else:
@@ -143,15 +546,12 @@ class TranslationService:
                 return text or ""
             
             try:
-                # Create translator instance
-                source = source_language if source_language else 'auto'
-                translator = GoogleTranslator(source=source, target=target_language)
-                
                 # Perform translation
-                translated_text = translator.translate(text)
+                source = source_language if source_language else 'auto'
+                translated_text = self._translate_text(text, source, target_language)
                 
                 # Validate result
-                if translated_text and isinstance(translated_text, str) and translated_text.strip():
+                if translated_text:
                     logger.info(f"Successfully translated text from {source} to {target_language}")
                     return translated_text
                 else:
@@ -163,6 +563,142 @@ class TranslationService:
                 logger.error(f"Error translating from {source_language or 'auto'} to {target_language}: {e}, returning original text")
                 return text
 
+    async def atranslate(self, text: str, source_language: Optional[str] = None,
+                         target_language: str = 'tr') -> str:
+        """
+        Async version of translate() that does not block the event loop
+        
+        Runs the translation on a dedicated thread pool behind a concurrency
+        limiter. A slot stays taken until its provider call actually finishes,
+        so timed-out calls still count against the limit.
+        
+        Args:
+            text: Text to translate
+            source_language: Source language code (optional, will auto-detect if None)
+            target_language: Target language code (default: 'tr' for Turkish)
+            
+        Returns:
+            Translated text, or original text if translation fails or times out
+        """
+        if not text or not isinstance(text, str) or not text.strip():
+            return text or ""
+        
+        if source_language == target_language:
+            return text
+        
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._semaphore
+        
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.timeout
+        
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Translation to {target_language} timed out waiting for a slot, returning original text")
+            return text
+        
+        try:
+            future = loop.run_in_executor(
+                self._executor,
+                functools.partial(self.translate, text, source_language, target_language)
+            )
+        except Exception as e:
+            semaphore.release()
+            logger.error(f"Error scheduling translation to {target_language}: {e}, returning original text")
+            return text
+        future.add_done_callback(lambda _: semaphore.release())
+        
+        try:
+            remaining = max(0.0, deadline - time.monotonic())
+            return await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+        except asyncio.TimeoutError:
+            logger.error(f"Translation to {target_language} timed out after {self.timeout}s, returning original text")
+            return text
+        except Exception as e:
+            logger.error(f"Error in async translation to {target_language}: {e}, returning original text")
+            return text
+    
+    def translate_many(self, texts: List[str], source_language: Optional[str] = None,
+                       target_language: str = 'tr', priority: int = BULK) -> List[str]:
+        """
+        Translate many texts with as few provider requests as possible
+        
+        Texts are masked like single translations. Cached templates are served
+        from the translation memory; the rest are packed into batches under the
+        provider character limit. Packing needs an explicit source language:
+        with auto-detection the provider would detect one language for the whole
+        batch, so mixed-language texts are sent one request per item.
+        
+        Args:
+            texts: Texts to translate
+            source_language: Source language code (optional, will auto-detect if None)
+            target_language: Target language code (default: 'tr' for Turkish)
+            priority: Scheduler priority (default: BULK, yields to interactive translations)
+            
+        Returns:
+            Translations in input order; each item falls back to its original text on failure
+        """
+        originals = [text if isinstance(text, str) else "" for text in texts]
+        source = source_language or 'auto'
+        
+        if not target_language or source == target_language:
+            return originals
+        
+        templates = list(originals)
+        values: List[List[str]] = [[] for _ in originals]
+        if self.masker:
+            for index, text in enumerate(originals):
+                if text.strip():
+                    templates[index], values[index] = self.masker.mask(text)
+        
+        translated: List[Optional[str]] = [None] * len(originals)
+        pending: List[int] = []
+        for index, template in enumerate(templates):
+            if not template.strip():
+                continue
+            if values[index] and not self.masker.has_translatable_text(template):
+                translated[index] = template
+                continue
+            if self.cache:
+                cached = self.cache.get(template, source, target_language)
+                if cached is not None:
+                    translated[index] = cached
+                    continue
+            pending.append(index)
+        
+        if source == 'auto':
+            batches = [[index] for index in pending]
+        else:
+            batches = self._build_batches(templates, pending)
+        for batch in batches:
+            batch_templates = [templates[index] for index in batch]
+            translations = self._translate_batch(batch_templates, source, target_language, priority)
+            for index, template, translated_text in zip(batch, batch_templates, translations):
+                if not translated_text:
+                    continue
+                translated[index] = translated_text
+                if self.cache:
+                    self.cache.set(template, source, target_language, translated_text)
+        
+        results: List[str] = []
+        for index, original in enumerate(originals):
+            text = translated[index]
+            if text is not None and values[index]:
+                text = self.masker.unmask(text, values[index])
+                if text is None:
+                    try:
+                        text = self._translate_cached(original, source, target_language, priority)
+                    except Exception as e:
+                        logger.error(f"Error translating unmasked batch item: {e}")
+            results.append(text or original)
+        
+        if pending:
+            translated_count = sum(1 for index in pending if translated[index])
+            logger.info(f"Batch translated {translated_count}/{len(pending)} texts from {source} to {target_language} in {len(batches)} requests")
+        return results
+
 # Singleton instance
 _translation_service = None
 
@@ -178,5 +714,24 @@ def get_translation_service(provider: str = "google") -> TranslationService:
     """
     global _translation_service
     if _translation_service is None:
-        _translation_service = TranslationService(provider=provider)
+        masker = None
+        if os.getenv("TRANSLATION_MASKING_ENABLED", "true").lower() not in ("0", "false", "no"):
+            masker = PlaceholderMasker()
+        _translation_service = TranslationService(
+            provider=os.getenv("TRANSLATION_PROVIDER") or provider,
+            cache=create_translation_cache(),
+            max_concurrency=int(os.getenv("TRANSLATION_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY))),
+            timeout=float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", str(DEFAULT_TIMEOUT_SECONDS))),
+            segment_workers=int(os.getenv("TRANSLATION_SEGMENT_WORKERS", str(DEFAULT_SEGMENT_WORKERS))),
+            fallback_provider=os.getenv("TRANSLATION_FALLBACK_PROVIDER") or None,
+            latency_budget=float(os.getenv("TRANSLATION_LATENCY_BUDGET_SECONDS", str(DEFAULT_LATENCY_BUDGET_SECONDS))),
+            breaker_failures=int(os.getenv("TRANSLATION_BREAKER_FAILURES", str(DEFAULT_BREAKER_FAILURES))),
+            breaker_cooldown=float(os.getenv("TRANSLATION_BREAKER_COOLDOWN_SECONDS", str(DEFAULT_BREAKER_COOLDOWN_SECONDS))),
+            masker=masker,
+            scheduler=TranslationScheduler(
+                chars_per_second=float(os.getenv("TRANSLATION_RATE_CHARS_PER_SECOND", str(DEFAULT_CHARS_PER_SECOND))),
+                requests_per_second=float(os.getenv("TRANSLATION_RATE_REQUESTS_PER_SECOND", str(DEFAULT_REQUESTS_PER_SECOND)))
+            ),
+            bulk_max_wait=float(os.getenv("TRANSLATION_BULK_MAX_WAIT_SECONDS", str(DEFAULT_BULK_MAX_WAIT_SECONDS)))
+        )
     return _translation_service
@@ -0,0 +1,182 @@
+"""
+Translation Worker
+Deferred translation for inbound messages
+Webhooks store the message first (translation_status='pending') and respond at once;
+the worker fills translated_content/content and updates conversations.last_message
+Messages a process did not get to (restart, crash) are claimed periodically by the
+recovery loop (claim_pending_translations), so each one is translated by one process
+"""
+from typing import Optional, Dict, Any
+from services.supabase_client import supabase
+from services.translation_service import get_translation_service
+from services.settings import get_settings
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Defaults (overridable via environment)
+DEFAULT_RECOVERY_BATCH_SIZE = 100
+DEFAULT_RECOVERY_POLL_SECONDS = 60.0
+# Younger pending messages are still being translated by the webhook's background task
+DEFAULT_RECOVERY_MIN_AGE_SECONDS = 60
+DEFAULT_STALE_LOCK_SECONDS = 300
+
+
+def is_deferred_translation_enabled() -> bool:
+    """
+    Check if deferred translation mode is on (DEFERRED_TRANSLATION=true)
+    """
+    return get_settings().deferred_translation
+
+
+def _store_translation(message_id: str, conversation_id: str, sent_at: Optional[str],
+                       original_content: str, translated_content: Optional[str]) -> str:
+    """
+    Write translation result back to messages and conversations
+
+    Returns:
+        Final translation status ('done' or 'failed')
+    """
+    status = "done" if translated_content else "failed"
+    display_content = translated_content or original_content
+
+    (
+        supabase
+        .table("messages")
+        .update({
+            'content': display_content,
+            'translated_content': display_content,
+            'translation_status': status
+        })
+        .eq('id', message_id)
+        .in_('translation_status', ['pending', 'translating'])
+        .execute()
+    )
+
+    # Only touch the conversation preview if this is still its latest message
+    if sent_at:
+        (
+            supabase
+            .table("conversations")
+            .update({'last_message': display_content[:200]})
+            .eq('id', conversation_id)
+            .eq('last_message_at', sent_at)
+            .execute()
+        )
+
+    return status
+
+
+async def translate_pending_message(message_id: str, conversation_id: str,
+                                    original_content: str, source_language: str,
+                                    sent_at: Optional[str] = None) -> str:
+    """
+    Translate a pending inbound message to Turkish and store the result
+    Never raises exceptions - failures are recorded as translation_status='failed'
+
+    Args:
+        message_id: Message ID
+        conversation_id: Conversation ID
+        original_content: Original message content in customer's language
+        source_language: Detected language code
+        sent_at: Message sent_at (used to keep conversation preview in sync)
+
+    Returns:
+        Final translation status
+    """
+    try:
+        translator = get_translation_service()
+        translated = await translator.atranslate(
+            original_content,
+            source_language=source_language,
+            target_language='tr'
+        )
+        # atranslate falls back to the original text on failure
+        if translated == original_content:
+            translated = None
+
+        status = await asyncio.to_thread(
+            _store_translation,
+            message_id,
+            conversation_id,
+            sent_at,
+            original_content,
+            translated
+        )
+        logger.info(f"Deferred translation for message {message_id}: {status}")
+        return status
+
+    except Exception as e:
+        logger.error(f"Deferred translation failed for message {message_id}: {e}", exc_info=True)
+        return "failed"
+
+
+async def drain_pending_translations(limit: int = DEFAULT_RECOVERY_BATCH_SIZE,
+                                     min_age_seconds: int = DEFAULT_RECOVERY_MIN_AGE_SECONDS,
+                                     stale_seconds: int = DEFAULT_STALE_LOCK_SECONDS) -> Dict[str, Any]:
+    """
+    Claim and translate one batch of messages still pending (e.g. left over from a restart)
+
+    Args:
+        limit: Max number of messages to claim
+        min_age_seconds: Leave younger pending messages to the webhook's background task
+        stale_seconds: Reclaim messages left 'translating' by a crashed process after this long
+
+    Returns:
+        Dict with processed count and per-status counts
+    """
+    try:
+        response = await asyncio.to_thread(
+            lambda: supabase.rpc("claim_pending_translations", {
+                'p_limit': limit,
+                'p_min_age_seconds': min_age_seconds,
+                'p_stale_seconds': stale_seconds,
+            }).execute()
+        )
+    except Exception as e:
+        logger.error(f"Could not claim pending translations: {e}")
+        return {"processed": 0, "error": str(e)}
+
+    rows = response.data or []
+    statuses = await asyncio.gather(*[
+        translate_pending_message(
+            message_id=row['id'],
+            conversation_id=row['conversation_id'],
+            original_content=row.get('original_content') or "",
+            source_language=row.get('original_language') or 'auto',
+            sent_at=row.get('sent_at')
+        )
+        for row in rows
+    ])
+
+    result: Dict[str, Any] = {"processed": len(rows)}
+    for status in statuses:
+        result[status] = result.get(status, 0) + 1
+    if rows:
+        logger.info(f"Drained pending translations: {result}")
+    return result
+
+
+async def recover_pending_translations(batch_size: Optional[int] = None,
+                                       poll_seconds: Optional[float] = None):
+    """
+    Recovery loop: drain claimed batches until none is full, then wait for the next poll
+    Runs until cancelled
+
+    Args:
+        batch_size: Messages claimed per batch (default: TRANSLATION_RECOVERY_BATCH_SIZE)
+        poll_seconds: Wait between polls once the backlog is drained (default: TRANSLATION_RECOVERY_POLL_SECONDS)
+    """
+    if batch_size is None:
+        batch_size = int(os.getenv("TRANSLATION_RECOVERY_BATCH_SIZE", str(DEFAULT_RECOVERY_BATCH_SIZE)))
+    if poll_seconds is None:
+        poll_seconds = float(os.getenv("TRANSLATION_RECOVERY_POLL_SECONDS", str(DEFAULT_RECOVERY_POLL_SECONDS)))
+    batch_size = max(1, batch_size)
+
+    while True:
+        result = await drain_pending_translations(limit=batch_size)
+        if result.get("processed", 0) >= batch_size:
+            continue
+        await asyncio.sleep(poll_seconds)
@@ -2,16 +2,13 @@
 WhatsApp Service
 Handles communication with whatsapp-service for sending messages
 """
-import os
 import httpx
 import logging
 from typing import Optional, Dict, Any
+from services.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
-# WhatsApp service URL (Docker internal or external)
-WHATSAPP_SERVICE_URL = os.getenv("WHATSAPP_SERVICE_URL", "http://whatsapp-service:3001")
-
 
 class WhatsAppService:
     """
@@ -19,9 +16,14 @@ class WhatsAppService:
     """
     
     def __init__(self, base_url: str = None):
-        self.base_url = base_url or WHATSAPP_SERVICE_URL
+        self._base_url = base_url
         self.timeout = 30.0  # seconds
     
+    @property
+    def base_url(self) -> str:
+        # WhatsApp service URL (Docker internal or external), follows settings reloads
+        return self._base_url or get_settings().whatsapp_service_url
+    
     async def send_message(self, to: str, message: str, message_type: str = "text", media: Optional[list] = None) -> Dict[str, Any]:
         """
         Send a WhatsApp message
@@ -1,13 +1,8 @@
-import os
 from supabase import create_client, Client
-from dotenv import load_dotenv
+from services.settings import get_settings
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ENV_PATH = os.path.join(BASE_DIR, ".env")
-load_dotenv(ENV_PATH)
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+SUPABASE_URL = get_settings().supabase_url
+SUPABASE_KEY = get_settings().supabase_service_role_key
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise RuntimeError("Supabase environment variables are missing")
@@ -8,10 +8,10 @@ import { NextResponse } from 'next/server'
 export async function POST(request: Request) {
   try {
     const body = await request.json()
-    const { conversation_id, content, media } = body
+    const { conversation_id, content, media, canned_response_id } = body
 
     const hasMedia = Array.isArray(media) && media.length > 0
-    if (!conversation_id || (!content && !hasMedia)) {
+    if (!conversation_id || (!content && !hasMedia && !canned_response_id)) {
       return NextResponse.json(
         { error: 'Missing conversation_id or content' },
         { status: 400 }
@@ -33,7 +33,8 @@ export async function POST(request: Request) {
       body: JSON.stringify({
         conversation_id,
         content: trimmedContent,
-        media: hasMedia ? media : []
+        media: hasMedia ? media : [],
+        canned_response_id: canned_response_id || null
       }),
     })
 
@@ -71,7 +72,9 @@ export async function POST(request: Request) {
           const message = messages[0]
           return NextResponse.json({
             ...message,
-            email_sent: result.email_sent || false
+            email_sent: result.email_sent || false,
+            blocked_reason: result.blocked_reason || null,
+            delivery_status: result.delivery_status || message.delivery_status || null
           })
         }
       }
@@ -86,7 +89,9 @@ export async function POST(request: Request) {
       media: hasMedia ? media : [],
       is_read: true,
       sent_at: new Date().toISOString(),
-      email_sent: result.email_sent || false
+      email_sent: result.email_sent || false,
+      blocked_reason: result.blocked_reason || null,
+      delivery_status: result.delivery_status || null
     })
   } catch (error) {
     console.error('Unexpected error:', error)
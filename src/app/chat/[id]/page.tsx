@@ -207,6 +207,9 @@ export default function ChatPage() {
         // Show notification
         if (result.blocked_reason) {
           setNotification({ type: 'error', message: result.blocked_reason })
+        } else if (result.delivery_status === 'pending') {
+          // Outbox mode: message is stored, delivery happens in the background
+          setNotification({ type: 'success', message: 'Mesaj kaydedildi, gönderim kuyruğa alındı' })
         } else if (conversation?.channel === 'email') {
           if (result.email_sent === true) {
             setNotification({ type: 'success', message: 'Mesaj gönderildi ve e-posta ile iletildi' })
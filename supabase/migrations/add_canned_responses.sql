@@ -0,0 +1,23 @@
+-- Migration: Canned responses (pre-translated agent reply templates)
+-- Turkish template + translations into every customer language seen in messages
+
+CREATE TABLE IF NOT EXISTS canned_responses (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  title TEXT NOT NULL,
+  content TEXT NOT NULL,
+  translations JSONB NOT NULL DEFAULT '{}'::jsonb,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_canned_responses_title ON canned_responses(title);
+
+-- Customer languages seen so far (templates are pre-translated into these)
+CREATE OR REPLACE VIEW message_languages AS
+SELECT DISTINCT original_language AS language
+FROM messages
+WHERE original_language IS NOT NULL
+  AND original_language NOT IN ('tr', 'unknown');
+
+COMMENT ON COLUMN canned_responses.content IS 'Template text in Turkish';
+COMMENT ON COLUMN canned_responses.translations IS 'Pre-translated template per language code, e.g. {"en": "...", "de": "..."}';
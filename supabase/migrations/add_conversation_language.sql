@@ -0,0 +1,26 @@
+-- Migration: Conversation-level customer language
+-- Detections of inbound messages are accumulated per conversation
+-- (weighted by confidence and message length) so agent replies can read
+-- the customer language without querying messages
+
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS language TEXT,
+ADD COLUMN IF NOT EXISTS language_scores JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+-- Seed existing conversations from their latest known customer message language
+UPDATE conversations c
+SET language = m.original_language,
+    language_scores = jsonb_build_object(m.original_language, 1.0)
+FROM (
+  SELECT DISTINCT ON (conversation_id) conversation_id, original_language
+  FROM messages
+  WHERE sender = 'customer'
+    AND original_language IS NOT NULL
+    AND original_language <> 'unknown'
+  ORDER BY conversation_id, sent_at DESC
+) m
+WHERE c.id = m.conversation_id
+  AND c.language IS NULL;
+
+COMMENT ON COLUMN conversations.language IS 'Estimated customer language (ISO 639-1), accumulated over inbound messages';
+COMMENT ON COLUMN conversations.language_scores IS 'Decayed detection weight per language code, e.g. {"en": 2.4, "de": 0.3}';
@@ -0,0 +1,65 @@
+-- Migration: Persistent outbound email queue
+-- Lead notifications and agent email replies are queued here and sent by the
+-- backend email queue worker (services/email_queue.py) with retries,
+-- per-domain / global rate limits and a dead-letter state
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  to_email TEXT NOT NULL,
+  recipient_domain TEXT NOT NULL,
+  subject TEXT NOT NULL,
+  body TEXT NOT NULL,
+  is_html BOOLEAN NOT NULL DEFAULT false,
+  reply_to TEXT,
+  in_reply_to TEXT,
+  attachments JSONB,
+  message_id UUID REFERENCES messages(id) ON DELETE SET NULL,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'dead')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  locked_at TIMESTAMP WITH TIME ZONE,
+  last_error TEXT,
+  sent_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Worker polls due rows only
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+ON email_outbox(next_attempt_at)
+WHERE status IN ('pending', 'sending');
+
+-- Dead letters are reviewed by hand
+CREATE INDEX IF NOT EXISTS idx_email_outbox_dead
+ON email_outbox(updated_at DESC)
+WHERE status = 'dead';
+
+ALTER TABLE email_outbox ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow all operations on email_outbox" ON email_outbox
+  FOR ALL USING (true) WITH CHECK (true);
+
+-- Claim due emails for one worker (SKIP LOCKED: several backend processes can
+-- drain the queue); rows stuck in 'sending' are reclaimed after p_stale_seconds
+CREATE OR REPLACE FUNCTION claim_email_outbox(p_limit INTEGER, p_stale_seconds INTEGER DEFAULT 300)
+RETURNS SETOF email_outbox AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE email_outbox e
+  SET status = 'sending',
+      locked_at = NOW(),
+      attempts = e.attempts + 1,
+      updated_at = NOW()
+  WHERE e.id IN (
+    SELECT id FROM email_outbox
+    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+       OR (status = 'sending' AND locked_at < NOW() - make_interval(secs => p_stale_seconds))
+    ORDER BY next_attempt_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING e.*;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE email_outbox IS 'Outbound email queue (pending -> sending -> sent, or dead after max attempts / permanent failure)';
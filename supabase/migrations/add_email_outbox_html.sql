@@ -0,0 +1,8 @@
+-- Migration: HTML alternative for queued emails
+-- Reply emails carry a plain-text body and an HTML alternative rendered from
+-- the same per-language template (services/email_templates.py)
+
+ALTER TABLE email_outbox
+ADD COLUMN IF NOT EXISTS html_body TEXT;
+
+COMMENT ON COLUMN email_outbox.html_body IS 'HTML alternative of the plain-text body (NULL = text only)';
@@ -0,0 +1,67 @@
+-- Migration: Fold message language detections into conversations atomically
+-- Inbound webhooks used to read language_scores, update them in Python and
+-- write them back, so two messages of one conversation arriving together lost
+-- one detection. fold_conversation_language locks the conversation row and
+-- decays/adds the scores in one statement sequence
+
+-- p_weight: detection weight of the new message (confidence x length factor)
+-- p_decay: factor applied to the existing scores first
+-- p_min_score: a language below this score never replaces the current one
+CREATE OR REPLACE FUNCTION fold_conversation_language(
+  p_conversation_id UUID,
+  p_language TEXT,
+  p_weight DOUBLE PRECISION,
+  p_decay DOUBLE PRECISION DEFAULT 0.9,
+  p_min_score DOUBLE PRECISION DEFAULT 0.3
+)
+RETURNS TEXT AS $$
+DECLARE
+  current_language TEXT;
+  scores JSONB;
+  best TEXT;
+BEGIN
+  SELECT language, language_scores INTO current_language, scores
+  FROM conversations
+  WHERE id = p_conversation_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT COALESCE(jsonb_object_agg(code, round(score::numeric, 4)), '{}'::jsonb)
+  INTO scores
+  FROM (
+    SELECT code, SUM(score) AS score
+    FROM (
+      SELECT key AS code, value::double precision * p_decay AS score
+      FROM jsonb_each_text(COALESCE(scores, '{}'::jsonb))
+      UNION ALL
+      SELECT p_language, p_weight
+    ) weighted
+    GROUP BY code
+  ) summed
+  WHERE score >= 0.01;
+
+  SELECT key INTO best
+  FROM jsonb_each_text(scores)
+  ORDER BY value::double precision DESC
+  LIMIT 1;
+
+  -- Ties keep the current language
+  IF current_language IS NOT NULL AND scores ? current_language
+     AND (scores->>current_language)::double precision >= (scores->>best)::double precision THEN
+    best := current_language;
+  END IF;
+  IF best IS NULL OR (scores->>best)::double precision < p_min_score THEN
+    best := current_language;
+  END IF;
+
+  UPDATE conversations
+  SET language = best,
+      language_scores = scores
+  WHERE id = p_conversation_id;
+
+  RETURN best;
+END;
+$$ LANGUAGE plpgsql;
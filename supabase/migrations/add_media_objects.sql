@@ -0,0 +1,38 @@
+-- Migration: Content-addressed media index
+-- Attachments are stored once per SHA-256 of their content
+-- (objects/<sha[0:2]>/<sha><ext>); a repeated upload of the same bytes only
+-- bumps the reference count here and reuses the stored object
+
+CREATE TABLE IF NOT EXISTS media_objects (
+  sha256 TEXT PRIMARY KEY,
+  bucket TEXT NOT NULL,
+  path TEXT NOT NULL,
+  size BIGINT NOT NULL,
+  content_type TEXT,
+  public_url TEXT,
+  reference_count INTEGER NOT NULL DEFAULT 1,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE media_objects ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow all operations on media_objects" ON media_objects
+  FOR ALL USING (true) WITH CHECK (true);
+
+-- Look up stored content and count the new reference in one round trip
+-- Returns no row if the content has not been stored yet
+CREATE OR REPLACE FUNCTION reuse_media_object(p_sha256 TEXT, p_bucket TEXT)
+RETURNS SETOF media_objects AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE media_objects m
+  SET reference_count = m.reference_count + 1,
+      last_used_at = NOW()
+  WHERE m.sha256 = p_sha256
+    AND m.bucket = p_bucket
+  RETURNING m.*;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE media_objects IS 'SHA-256 -> stored Storage object of message attachments (deduplicated uploads)';
@@ -0,0 +1,94 @@
+-- Migration: Transactional outbox for agent message delivery
+-- /api/messages/send stores the message and its outbox row in one transaction
+-- (enqueue_agent_message) and returns; the backend delivery worker claims
+-- outbox rows (claim_message_outbox), translates, sends via email/WhatsApp
+-- and records the result in messages.delivery_status
+
+ALTER TABLE messages
+ADD COLUMN IF NOT EXISTS delivery_status TEXT;
+
+COMMENT ON COLUMN messages.delivery_status IS 'Channel delivery of agent messages: pending, sent, failed, blocked, skipped (NULL = delivered inline)';
+
+CREATE TABLE IF NOT EXISTS message_outbox (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  message_id UUID NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
+  conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+  channel TEXT NOT NULL,
+  payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'done', 'failed')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  locked_at TIMESTAMP WITH TIME ZONE,
+  last_error TEXT,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Worker polls due rows only
+CREATE INDEX IF NOT EXISTS idx_message_outbox_due
+ON message_outbox(next_attempt_at)
+WHERE status IN ('pending', 'processing');
+
+ALTER TABLE message_outbox ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow all operations on message_outbox" ON message_outbox
+  FOR ALL USING (true) WITH CHECK (true);
+
+-- Insert agent message + outbox row atomically
+-- p_payload NULL stores the message without delivery (e.g. blocked)
+CREATE OR REPLACE FUNCTION enqueue_agent_message(
+  p_conversation_id UUID,
+  p_content TEXT,
+  p_media JSONB,
+  p_channel TEXT,
+  p_payload JSONB,
+  p_delivery_status TEXT DEFAULT 'pending'
+)
+RETURNS messages AS $$
+DECLARE
+  new_message messages;
+BEGIN
+  INSERT INTO messages (
+    conversation_id, sender, content, original_content, original_language,
+    translated_content, is_read, media, delivery_status
+  )
+  VALUES (
+    p_conversation_id, 'agent', p_content, p_content, 'tr',
+    p_content, true, p_media, p_delivery_status
+  )
+  RETURNING * INTO new_message;
+
+  IF p_payload IS NOT NULL THEN
+    INSERT INTO message_outbox (message_id, conversation_id, channel, payload)
+    VALUES (new_message.id, p_conversation_id, p_channel, p_payload);
+  END IF;
+
+  RETURN new_message;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Claim due outbox rows for one worker; SKIP LOCKED lets several backend
+-- processes drain the outbox without double delivery. Rows stuck in
+-- 'processing' (worker crashed) are reclaimed after p_stale_seconds
+CREATE OR REPLACE FUNCTION claim_message_outbox(p_limit INTEGER, p_stale_seconds INTEGER DEFAULT 300)
+RETURNS SETOF message_outbox AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE message_outbox o
+  SET status = 'processing',
+      locked_at = NOW(),
+      attempts = o.attempts + 1,
+      updated_at = NOW()
+  WHERE o.id IN (
+    SELECT id FROM message_outbox
+    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+       OR (status = 'processing' AND locked_at < NOW() - make_interval(secs => p_stale_seconds))
+    ORDER BY next_attempt_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING o.*;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE message_outbox IS 'Pending channel deliveries of agent messages (drained by services/message_outbox.py)';
@@ -0,0 +1,13 @@
+-- Migration: Add translation status to messages
+-- Used by deferred translation: inbound messages are stored first with
+-- translation_status = 'pending' and translated in the background
+
+ALTER TABLE messages
+ADD COLUMN IF NOT EXISTS translation_status TEXT;
+
+-- Background worker picks up pending rows (e.g. after a restart)
+CREATE INDEX IF NOT EXISTS idx_messages_translation_pending
+ON messages(sent_at)
+WHERE translation_status = 'pending';
+
+COMMENT ON COLUMN messages.translation_status IS 'Deferred translation state: pending, done, failed (NULL = translated inline)';
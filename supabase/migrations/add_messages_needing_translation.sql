@@ -0,0 +1,27 @@
+-- Migration: Backlog view for the translation backfill job
+-- Customer messages whose language was never detected, or whose translation
+-- failed (translated_content equals original_content for a non-Turkish message)
+
+CREATE OR REPLACE VIEW messages_needing_translation AS
+SELECT
+  id,
+  conversation_id,
+  sender,
+  content,
+  original_content,
+  original_language,
+  translated_content,
+  translation_status,
+  sent_at
+FROM messages
+WHERE sender = 'customer'
+  AND original_content IS NOT NULL
+  AND original_content <> ''
+  AND (
+    original_language IS NULL
+    OR original_language = 'unknown'
+    OR translation_status = 'failed'
+    OR (original_language <> 'tr' AND translated_content = original_content)
+  );
+
+COMMENT ON VIEW messages_needing_translation IS 'Rows scanned by services/translation_backfill.py (keyset pagination on id)';
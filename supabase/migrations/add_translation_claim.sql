@@ -0,0 +1,39 @@
+-- Migration: Claim pending translations atomically
+-- The recovery loop in every backend process calls claim_pending_translations;
+-- claimed rows move to translation_status = 'translating', so several uvicorn
+-- workers never translate the same message. Rows left 'translating' by a
+-- crashed process are reclaimed after p_stale_seconds
+
+ALTER TABLE messages
+ADD COLUMN IF NOT EXISTS translation_locked_at TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_messages_translation_claimable
+ON messages(sent_at)
+WHERE translation_status IN ('pending', 'translating');
+
+-- Fresh pending rows (younger than p_min_age_seconds) are left to the webhook's
+-- own background task
+CREATE OR REPLACE FUNCTION claim_pending_translations(
+  p_limit INTEGER,
+  p_min_age_seconds INTEGER DEFAULT 60,
+  p_stale_seconds INTEGER DEFAULT 300
+)
+RETURNS SETOF messages AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE messages m
+  SET translation_status = 'translating',
+      translation_locked_at = NOW()
+  WHERE m.id IN (
+    SELECT id FROM messages
+    WHERE (translation_status = 'pending' AND sent_at < NOW() - make_interval(secs => p_min_age_seconds))
+       OR (translation_status = 'translating' AND translation_locked_at < NOW() - make_interval(secs => p_stale_seconds))
+    ORDER BY sent_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING m.*;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON COLUMN messages.translation_status IS 'Deferred translation state: pending, translating, done, failed (NULL = translated inline)';